@@ -0,0 +1,308 @@
+"""Headless control API: REST and WebSocket on top of the ProcessManager.
+
+    GET  /api/status             state, selected device, every device with its route position
+    GET  /api/logs?lines=N       recent log lines
+    POST /api/commands           {"commands": [{"op": "set_location", "lat": 25.03, "lon": 121.56}, ...],
+                                  "stop_on_error": true}
+    POST /api/{op}               one command, same fields as above (without "op")
+    GET  /api/routes?search=&lat=&lon=&radius=   the route library (nearest first with lat/lon)
+    GET  /api/routes/{id}/polyline?zoom=&south=&west=&north=&east=   encoded-polyline overlay, see polyline.py
+    POST /api/routes             {"path": "ride.gpx", "name": "..."}: adds a GPX file to the library
+    DELETE /api/routes/{id}      drops a route from the library (the GPX file is left alone)
+    POST /api/scenario           {"path": "scenario.yaml"}: runs a timeline, see scenario.py
+    WS   /api/events             the full state once, then only what changed, plus log batches
+
+Commands run in order; each result carries ok, the elapsed ms and the
+manager's return value. The UI mounts the same router, so scripts and
+browser tabs share one manager. `python main.py --headless` serves only
+this API and never imports NiceGUI. Both modes also take the same
+commands over a local control socket (see control_socket.py and cli.py).
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Callable, Optional
+
+from fastapi import APIRouter, Body, FastAPI, HTTPException, WebSocket
+
+from control_socket import ControlServer
+from noise import NoiseModel
+from polyline import RouteTiers, TierCache
+from process_manager import ProcessManager
+from route_library import NEAR_RADIUS_M
+from scenario import Scenario, step_ok
+from shared_state import POSITION_RATE_HZ, SharedState
+
+EVENT_QUEUE_SIZE = 1000 # per WebSocket client; on overflow the client gets a fresh snapshot
+
+
+def _noise_model(args: dict) -> Optional[NoiseModel]:
+    if not any(key in args for key in ("seed", "jitter", "scatter", "speed_variation")):
+        return None # plain uniform jitter of args["noise"] ms
+    return NoiseModel(seed=args.get("seed"), jitter_ms=float(args.get("noise", 500)), jitter=args.get("jitter", "uniform"),
+                      scatter_m=float(args.get("scatter", 0.0)), speed_variation=float(args.get("speed_variation", 0.0)))
+
+
+def _route_args(args: dict) -> tuple:
+    return (args["gpx_path"], str(int(args.get("noise", 500))), float(args.get("tolerance", 0.0)),
+            float(args.get("step", 0.0)), float(args.get("target_speed", 0.0)), _noise_model(args))
+
+
+async def run_command(manager: ProcessManager, command: dict):
+    """Executes one {"op": ..., ...} command and returns the manager's result."""
+    op = command.get("op")
+    udid = command.get("udid")
+    if op == "connect":
+        return await manager.connect()
+    if op == "start_tunnel_a":
+        return await manager.start_tunnel_a()
+    if op == "start_tunnel_b":
+        return await manager.start_tunnel_b()
+    if op == "stop":
+        return await manager.stop_services()
+    if op == "select":
+        manager.select_device(command["udid"])
+        return manager.selected == command["udid"]
+    if op == "set_location":
+        return await manager.set_location(str(float(command["lat"])), str(float(command["lon"])), udid)
+    if "route_id" in command and "gpx_path" not in command:
+        entry = manager.route_library.get(command["route_id"])
+        if entry is None:
+            raise ValueError(f"no route {command['route_id']} in the library")
+        command = {**command, "gpx_path": entry["path"]}
+    if op == "play_route":
+        gpx_path, noise, tolerance, step, target_speed, noise_model = _route_args(command)
+        return await manager.play_route(gpx_path, noise, tolerance, step, target_speed, udid=udid,
+                                        noise_model=noise_model, speed=float(command.get("speed", 1.0)))
+    # "all": true applies these to every device playing a route
+    if op == "pause":
+        return manager.pause_route(udid, fleet=bool(command.get("all")))
+    if op == "resume":
+        return manager.resume_route(udid, fleet=bool(command.get("all")))
+    if op == "speed":
+        return manager.set_route_speed(float(command["speed"]), udid, fleet=bool(command.get("all")))
+    if op == "seek":
+        return manager.seek_route(command.get("distance"), command.get("seconds"), udid)
+    if op == "clear_location":
+        return await manager.clear_location(udid)
+    if op == "broadcast":
+        action = command["action"]
+        if action == "set_location":
+            args = (str(float(command["lat"])), str(float(command["lon"])))
+        elif action == "play_route":
+            args = _route_args(command)
+        else:
+            args = ()
+        return await manager.broadcast(action, *args, udids=command.get("udids"),
+                                       speed=float(command.get("speed", 1.0)))
+    if op == "sleep":
+        await asyncio.sleep(float(command["seconds"]))
+        return True
+    if op == "status":
+        return status(manager)
+    if op == "replay":
+        speed = float(command.get("speed", 1.0))
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        return await manager.replay_journal(command["path"], speed, udid)
+    if op == "scenario":
+        try:
+            scenario = Scenario.load(command["path"])
+        except OSError as e:
+            raise ValueError(f"cannot read scenario: {e}")
+        steps = await scenario.run(manager, lambda step: run_command(manager, step), command.get("stop_on_error", True))
+        failed = [r["step"] for r in steps if not r["ok"]]
+        return {"ok": not failed and len(steps) == len(scenario.steps),
+                "error": f"step {failed[0]} failed" if failed else None, "steps": steps}
+    raise ValueError(f"unknown op: {op}")
+
+
+def status(manager: ProcessManager) -> dict:
+    return {
+        "state": manager.state,
+        "selected": manager.selected,
+        "devices": [device.info() for device in manager.devices.values()],
+    }
+
+
+async def run_commands(manager: ProcessManager, commands: list[dict], stop_on_error: bool = True) -> list[dict]:
+    results = []
+    for command in commands:
+        started = time.perf_counter()
+        try:
+            value = await run_command(manager, command)
+            # Manager actions report failure as False (and log why); connect as {"ok": ...}, broadcast per device
+            ok = step_ok(value)
+            error = None if ok else (value.get("error") if isinstance(value, dict) else None) or "failed (see log)"
+        except (KeyError, ValueError, TypeError) as e:
+            ok, value, error = False, None, f"bad command: {e}"
+        results.append({"op": command.get("op"), "ok": ok, "error": error, "result": value,
+                        "ms": round((time.perf_counter() - started) * 1000, 2)})
+        if not ok and stop_on_error:
+            break
+    return results
+
+
+def make_executor(get_manager: Callable[[], ProcessManager], shared: SharedState):
+    """Returns execute(commands, stop_on_error) for the router and the control socket."""
+    async def execute(commands: list[dict], stop_on_error: bool = True) -> list[dict]:
+        manager = get_manager()
+        results = await run_commands(manager, commands, stop_on_error)
+        # Keep the tabs' pause button in step with API-driven pauses
+        player = manager.player
+        shared.set_paused(bool(player and player.paused))
+        return results
+
+    return execute
+
+
+def create_router(get_manager: Callable[[], ProcessManager], shared: SharedState) -> APIRouter:
+    router = APIRouter(prefix="/api")
+    execute = make_executor(get_manager, shared)
+
+    @router.get("/status")
+    def get_status():
+        return status(get_manager())
+
+    @router.get("/logs")
+    def get_logs(lines: int = 200):
+        backlog = list(shared.backlog)
+        return {"lines": backlog[-lines:] if lines > 0 else []}
+
+    @router.get("/routes")
+    def get_routes(search: Optional[str] = None, lat: Optional[float] = None, lon: Optional[float] = None,
+                   radius: float = NEAR_RADIUS_M, limit: int = 100):
+        library = get_manager().route_library
+        if lat is not None and lon is not None:
+            return {"routes": library.near(lat, lon, radius, limit)}
+        return {"routes": library.entries(search, limit)}
+
+    tier_cache = TierCache()
+
+    @router.get("/routes/{route_id}/polyline")
+    async def get_route_polyline(route_id: int, zoom: float = 13, south: Optional[float] = None,
+                                 west: Optional[float] = None, north: Optional[float] = None,
+                                 east: Optional[float] = None):
+        manager = get_manager()
+        entry = manager.route_library.get(route_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"no route {route_id} in the library")
+        tiers = tier_cache.get(entry["digest"])
+        if tiers is None:
+            # Decimated once per route; every later zoom or pan is a lookup plus encoding
+            route, _ = await asyncio.to_thread(manager.route_cache.load, entry["path"])
+            tiers = await asyncio.to_thread(RouteTiers, route)
+            tier_cache.put(entry["digest"], tiers)
+        bbox = (south, west, north, east) if None not in (south, west, north, east) else None
+        return tiers.polylines(zoom, bbox)
+
+    @router.post("/routes")
+    async def post_route(path: str = Body(..., embed=True), name: Optional[str] = Body(None, embed=True)):
+        entry = await get_manager().add_route(path, name or os.path.basename(path))
+        if entry is None:
+            raise HTTPException(status_code=400, detail="could not read the route (see log)")
+        shared.library_changed()
+        return entry
+
+    @router.delete("/routes/{route_id}")
+    def delete_route(route_id: int):
+        if not get_manager().route_library.remove(route_id):
+            raise HTTPException(status_code=404, detail=f"no route {route_id} in the library")
+        shared.library_changed()
+        return {"removed": route_id}
+
+    @router.post("/commands")
+    async def post_commands(commands: list[dict] = Body(..., embed=True), stop_on_error: bool = Body(True, embed=True)):
+        return {"results": await execute(commands, stop_on_error)}
+
+    @router.post("/{op}")
+    async def post_command(op: str, args: dict = Body(default={})):
+        result = (await execute([{**args, "op": op}]))[0]
+        if result["error"] and result["error"].startswith("bad command"):
+            raise HTTPException(status_code=400, detail=result["error"])
+        return result
+
+    @router.websocket("/events")
+    async def events(websocket: WebSocket):
+        await websocket.accept()
+        get_manager() # make sure there is something to report on
+        queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+
+        def view(diff: dict):
+            try:
+                queue.put_nowait(diff)
+            except asyncio.QueueFull:
+                # Too slow to keep up: replace the backlog with one full snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({**shared.snapshot(), "resync": True})
+
+        async def send():
+            while True:
+                diff = await queue.get()
+                await websocket.send_json({key: list(value) if isinstance(value, tuple) else value
+                                           for key, value in diff.items()})
+
+        shared.subscribe(view)
+        sender = asyncio.create_task(send())
+        try:
+            # Clients only listen; receiving is how a closed socket gets noticed
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            shared.unsubscribe(view)
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+
+    return router
+
+
+def create_app(mock: bool = False, position_rate: float = POSITION_RATE_HZ) -> FastAPI:
+    """A bare FastAPI app with only the control API (no NiceGUI)."""
+    if mock:
+        os.environ['IGEOFAKE_MOCK'] = '1'
+    shared = SharedState()
+    if position_rate > 0:
+        shared.position_interval = 1.0 / position_rate
+    manager = ProcessManager(shared.on_log, shared.on_status,
+                             position_callback=shared.on_position,
+                             devices_callback=lambda udids: shared.on_devices(udids, manager.selected))
+    control = ControlServer(make_executor(lambda: manager, shared), log=manager.log)
+    app = FastAPI(title='iGeoFake API')
+    app.include_router(create_router(lambda: manager, shared))
+
+    @app.on_event("startup")
+    async def startup():
+        await control.start()
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        await control.stop()
+        await manager.stop_services()
+        manager.close_journal()
+        manager.route_library.close()
+        await manager.logs.close()
+
+    return app
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='iGeoFake headless control API')
+    parser.add_argument('--headless', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--mock', action='store_true', help='Run in mock mode')
+    parser.add_argument('--log-file', metavar='PATH', help='Also write all process logs to a rotating log file')
+    parser.add_argument('--journal', metavar='PATH', help='Record every location sent to a device (see journal.py)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--position-rate', type=float, metavar='HZ', default=POSITION_RATE_HZ,
+                        help='Playback position updates pushed to each /api/events client per second')
+    args = parser.parse_args(argv)
+
+    if args.log_file:
+        os.environ['IGEOFAKE_LOG_FILE'] = args.log_file
+    if args.journal:
+        os.environ['IGEOFAKE_JOURNAL'] = args.journal
+    uvicorn.run(create_app(mock=args.mock, position_rate=args.position_rate), host=args.host, port=args.port, log_level='warning')
@@ -0,0 +1,161 @@
+"""Latency benchmark for the ProcessManager lifecycle, run against mock_cli.py.
+
+Headless: no NiceGUI page and no device. Each iteration brings the mock
+tunnels up, teleports, plays a short route, clears and tears everything
+down, timing every step. Percentiles go to stdout and to a JSON file so
+runs can be compared between releases.
+
+Usage: python bench.py [--iterations N] [--teleports N] [--output bench.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# The mock tunnels must be used, and Tunnel B must be the one that finds
+# the device so that its RSD timing can be measured
+os.environ['IGEOFAKE_MOCK'] = '1'
+os.environ['IGEOFAKE_MOCK_DEVICES'] = '0'
+
+from preprocess import from_columns
+from process_manager import ProcessManager, STATE_TUNNEL_A_RUNNING
+from route import write_gpx
+
+STEP_TIMEOUT = 30.0
+
+
+def summarize(samples: list[float]) -> dict:
+    values = np.asarray(samples, dtype=float)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "n": len(values),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def make_route(path: str, points: int = 20):
+    lat = 25.0330 + np.arange(points) * 1e-4
+    lon = 121.5654 + np.arange(points) * 1e-4
+    t = 1.7e9 + np.arange(points) * 0.05
+    write_gpx(from_columns(lat, lon, None, t), path)
+
+
+class Probe:
+    """Turns manager callbacks into awaitable events."""
+
+    def __init__(self):
+        self.states: dict[str, asyncio.Event] = {}
+        self.rsd = asyncio.Event()
+        self.position = asyncio.Event()
+
+    def state(self, name: str) -> asyncio.Event:
+        return self.states.setdefault(name, asyncio.Event())
+
+    def on_status(self, new_state: str):
+        self.state(new_state).set()
+
+    def on_position(self, position: dict):
+        self.position.set()
+
+    def reset(self):
+        for event in (*self.states.values(), self.rsd, self.position):
+            event.clear()
+
+
+async def timed(samples: dict, name: str, awaitable):
+    started = time.perf_counter()
+    await asyncio.wait_for(awaitable, timeout=STEP_TIMEOUT)
+    samples.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+
+
+async def run_iteration(manager: ProcessManager, probe: Probe, samples: dict, gpx_path: str, teleports: int):
+    probe.reset()
+
+    async def tunnel_a():
+        await manager.start_tunnel_a()
+        await probe.state(STATE_TUNNEL_A_RUNNING).wait()
+    await timed(samples, "start_tunnel_a", tunnel_a())
+
+    async def tunnel_b():
+        await manager.start_tunnel_b()
+        await probe.rsd.wait()
+    await timed(samples, "start_tunnel_b_to_rsd", tunnel_b())
+
+    # The first teleport includes spawning the location session
+    await timed(samples, "set_location_cold", manager.set_location("25.0330", "121.5654"))
+    for i in range(teleports):
+        await timed(samples, "set_location", manager.set_location(f"{25.0330 + i * 1e-4:.6f}", "121.5654"))
+
+    async def play():
+        probe.position.clear()
+        await manager.play_route(gpx_path, "0")
+        await probe.position.wait()
+    await timed(samples, "play_route_start", play())
+
+    await timed(samples, "clear_location", manager.clear_location())
+    await timed(samples, "stop_services", manager.stop_services())
+
+
+async def main_async(args) -> dict:
+    probe = Probe()
+    manager = ProcessManager(lambda message: None, probe.on_status, position_callback=probe.on_position)
+
+    # Signal as soon as Tunnel B's RSD is registered, independent of log batching
+    register_rsd = manager._register_rsd
+
+    def on_rsd(udid, rsd_ip, rsd_port):
+        register_rsd(udid, rsd_ip, rsd_port)
+        probe.rsd.set()
+    manager._register_rsd = on_rsd
+
+    samples: dict[str, list[float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        gpx_path = os.path.join(tmp, 'bench_route.gpx')
+        make_route(gpx_path)
+        for i in range(args.iterations):
+            await run_iteration(manager, probe, samples, gpx_path, args.teleports)
+            print(f"iteration {i + 1}/{args.iterations} done", file=sys.stderr)
+    await manager.logs.close()
+
+    return {
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "iterations": args.iterations,
+        "teleports": args.teleports,
+        "results": {name: summarize(values) for name, values in samples.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='iGeoFake lifecycle latency benchmark (mock mode)')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--teleports', type=int, default=20, help='set_location calls per iteration')
+    parser.add_argument('--output', default='bench.json', help='JSON report path')
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) # relative to where we were started, before the chdir
+
+    # mock_cli.py is resolved relative to the working directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    report = asyncio.run(main_async(args))
+
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'step':<24}{'n':>5}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+    for name, r in report["results"].items():
+        print(f"{name:<24}{r['n']:>5}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}")
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Fast-start command line client for a running iGeoFake daemon.
+
+    python cli.py connect
+    python cli.py set 25.033 121.565 [--udid UDID]
+    python cli.py play route.gpx [--noise MS] [--speed X] [--udid UDID]
+                  [--seed N] [--jitter uniform|gaussian] [--scatter M] [--speed_variation F]
+    python cli.py pause | resume | clear | status | stop
+    python cli.py run scenario.yaml         play a timeline scenario (see scenario.py)
+    python cli.py replay session.igj [--speed X]   re-send a recorded journal (see journal.py)
+    python cli.py batch < commands.txt      one command per line, sent as one request
+
+The daemon (main.py, with or without --headless) owns the tunnels and
+location sessions and listens on a local control socket; this client
+only sends one JSON line and reads one back. It deliberately imports
+nothing beyond the standard library basics so an invocation costs
+little more than interpreter start-up (run it with `python -S` to skip
+site-packages start-up hooks as well).
+
+There is no installed `igeofake` command: the project is a directory of
+flat modules with no build backend, and a console-script wrapper would
+import its entry point through site-packages and lose the fast start.
+An alias gives the same thing:
+
+    alias igeofake='python -S /path/to/igeofake/cli.py'
+"""
+import json
+import os
+import socket
+import sys
+
+CONTROL_PORT = int(os.environ.get('IGEOFAKE_CONTROL_PORT', '8766')) # loopback TCP where there is no AF_UNIX
+TIMEOUT = float(os.environ.get('IGEOFAKE_CLI_TIMEOUT', '60')) # seconds; connect can take a while
+
+USAGE = __doc__.split("\n\n")[1]
+
+
+def control_address():
+    """Unix socket path of the daemon, or (host, port) on platforms without AF_UNIX."""
+    if sys.platform == 'win32' or not hasattr(socket, 'AF_UNIX'):
+        return ('127.0.0.1', CONTROL_PORT)
+    if os.environ.get('IGEOFAKE_SOCKET'):
+        return os.environ['IGEOFAKE_SOCKET']
+    runtime = os.environ.get('XDG_RUNTIME_DIR') or '/tmp'
+    return os.path.join(runtime, f'igeofake-{os.getuid()}.sock')
+
+
+def parse(argv: list[str]) -> dict:
+    """Turns one CLI command into an API command dict; raises ValueError on bad input."""
+    if not argv:
+        raise ValueError("missing command")
+    words, options = [], {}
+    i = 0
+    while i < len(argv):
+        if argv[i].startswith('--'):
+            if i + 1 >= len(argv):
+                raise ValueError(f"{argv[i]} needs a value")
+            options[argv[i][2:]] = argv[i + 1]
+            i += 2
+        else:
+            words.append(argv[i])
+            i += 1
+
+    name, args = words[0], words[1:]
+    command = {"udid": options.pop("udid")} if "udid" in options else {}
+    if name == "set" and len(args) == 2:
+        command.update(op="set_location", lat=float(args[0]), lon=float(args[1]))
+    elif name == "play" and len(args) == 1:
+        command.update(op="play_route", gpx_path=os.path.abspath(args[0]))
+        for key in ("noise", "speed", "tolerance", "scatter", "speed_variation"):
+            if key in options:
+                command[key] = float(options.pop(key))
+        if "seed" in options:
+            command["seed"] = int(options.pop("seed"))
+        if "jitter" in options:
+            command["jitter"] = options.pop("jitter")
+    elif name == "run" and len(args) == 1:
+        command.update(op="scenario", path=os.path.abspath(args[0]))
+    elif name == "replay" and len(args) == 1:
+        command.update(op="replay", path=os.path.abspath(args[0]))
+        if "speed" in options:
+            command["speed"] = float(options.pop("speed"))
+    elif name in ("clear", "pause", "resume", "status", "connect", "stop") and not args:
+        command["op"] = {"clear": "clear_location"}.get(name, name)
+    else:
+        raise ValueError(f"bad command: {' '.join(argv)}")
+    if options:
+        raise ValueError(f"unknown option --{next(iter(options))}")
+    return command
+
+
+def send(request: dict, timeout: float | None = TIMEOUT) -> dict:
+    address = control_address()
+    family = socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        reply = sock.makefile("rb").readline()
+    if not reply:
+        raise ConnectionError("daemon closed the connection")
+    return json.loads(reply)
+
+
+def main(argv: list[str]) -> int:
+    if not argv or argv[0] in ("-h", "--help"):
+        print(USAGE)
+        return 0 if argv else 2
+    try:
+        if argv[0] == "batch":
+            commands = [parse(line.split()) for line in sys.stdin if line.strip() and not line.startswith("#")]
+            request = {"commands": commands, "stop_on_error": False}
+        else:
+            request = {"commands": [parse(argv)]}
+    except ValueError as e:
+        print(f"igeofake: {e}", file=sys.stderr)
+        return 2
+
+    # A scenario or replay runs as long as its timeline says
+    long_running = any(command["op"] in ("scenario", "replay") for command in request["commands"])
+    try:
+        reply = send(request, timeout=None if long_running else TIMEOUT)
+    except (OSError, ValueError) as e:
+        print(f"igeofake: no daemon at {control_address()} ({e})", file=sys.stderr)
+        return 3
+    if "error" in reply:
+        print(f"igeofake: {reply['error']}", file=sys.stderr)
+        return 1
+
+    failed = 0
+    for result in reply["results"]:
+        if not result["ok"]:
+            failed += 1
+            print(f"igeofake: {result['op']}: {result['error']}", file=sys.stderr)
+        elif result["op"] in ("status", "connect", "scenario"):
+            print(json.dumps(result["result"], indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,93 @@
+"""Local control socket for cli.py.
+
+A connection carries newline-delimited JSON: each request line is
+{"commands": [...], "stop_on_error": bool} in the /api/commands format,
+answered by one line {"results": [...]} or {"error": "..."}. The socket
+is a Unix domain socket readable only by the owner, or a loopback TCP
+port on Windows.
+"""
+import asyncio
+import json
+import os
+from typing import Awaitable, Callable, Optional
+
+from cli import control_address
+
+REQUEST_LIMIT = 1024 * 1024 # bytes per request line (a batch of a few thousand commands)
+
+
+class ControlServer:
+    def __init__(self, execute: Callable[[list[dict], bool], Awaitable[list[dict]]],
+                 log: Optional[Callable[[str], None]] = None, address=None):
+        self.execute = execute
+        self.log = log or (lambda message: None)
+        self.address = address or control_address()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        if self._server:
+            return
+        try:
+            if isinstance(self.address, tuple):
+                self._server = await asyncio.start_server(self._handle, *self.address, limit=REQUEST_LIMIT)
+            else:
+                if not await self._claim_path():
+                    return
+                self._server = await asyncio.start_unix_server(self._handle, self.address, limit=REQUEST_LIMIT)
+                os.chmod(self.address, 0o600)
+        except OSError as e:
+            self.log(f"Control socket unavailable at {self.address}: {e}")
+            return
+        self.log(f"Control socket listening at {self.address}")
+
+    async def _claim_path(self) -> bool:
+        """Removes a socket file left by a dead daemon; refuses to steal a live one."""
+        if not os.path.exists(self.address):
+            return True
+        try:
+            _, writer = await asyncio.open_unix_connection(self.address)
+            writer.close()
+            self.log(f"Control socket {self.address} is in use by another daemon, not listening")
+            return False
+        except OSError:
+            os.unlink(self.address)
+            return True
+
+    def close(self):
+        """Stops accepting connections and removes the socket file."""
+        if not self._server:
+            return
+        self._server.close()
+        if not isinstance(self.address, tuple):
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+    async def stop(self):
+        server = self._server
+        self.close()
+        self._server = None
+        if server:
+            await server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    commands = request["commands"]
+                    if not isinstance(commands, list) or not all(isinstance(c, dict) for c in commands):
+                        raise ValueError("commands must be a list of objects")
+                    reply = {"results": await self.execute(commands, request.get("stop_on_error", True))}
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {"error": f"bad request: {e}"}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, asyncio.IncompleteReadError):
+            pass
+        except ValueError:
+            # readline() raises ValueError for a line over REQUEST_LIMIT
+            writer.write(json.dumps({"error": f"request over {REQUEST_LIMIT} bytes"}).encode() + b"\n")
+        finally:
+            writer.close()
@@ -0,0 +1,284 @@
+"""Binary journal of every location sent to a device, for replay and diffing.
+
+Layout: a 64-byte header, then fixed-width 32-byte records
+
+    t (f8, seconds on the journal's clock), lat (f8), lon (f8),
+    device (u4, index into the sidecar <journal>.devices), source (u1), 3 pad bytes
+
+Clears are stored with NaN coordinates. Every run of the app that opens
+the journal starts with a session record carrying its wall-clock start
+time in lat; t runs on the monotonic clock within a session and picks up
+where the previous session ended, so downtime between runs (or a reboot
+resetting the monotonic clock) never shows up in the timeline.
+
+The writer packs records into a preallocated array and appends it in one
+write when it is full, FLUSH_INTERVAL after its first unwritten record
+(a timer on the running event loop; without a loop every record is
+written through), and on flush/close. Readers memory-map the file and
+work on column views, so a long session is never turned into Python
+objects as a whole.
+
+    python journal.py show session.igj
+    python journal.py export session.igj out.gpx [--device UDID]
+    python journal.py diff a.igj b.igj
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import struct
+import sys
+import time
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+from scenario import wait_until
+
+# magic, format version, record size, wall-clock time the journal was created
+HEADER = struct.Struct('<4sII4xd40x')
+MAGIC = b'IGFJ'
+VERSION = 2
+
+RECORD = np.dtype([('t', '<f8'), ('lat', '<f8'), ('lon', '<f8'), ('device', '<u4'), ('source', 'u1'), ('pad', 'V3')])
+
+SOURCE_SET = 1 # set_location
+SOURCE_ROUTE = 2 # route playback point
+SOURCE_FOLLOW = 3 # follow-the-marker update
+SOURCE_CLEAR = 4 # clear_location
+SOURCE_SESSION = 5 # start of a run of the app; not a location
+SOURCES = {SOURCE_SET: "set", SOURCE_ROUTE: "route", SOURCE_FOLLOW: "follow", SOURCE_CLEAR: "clear"}
+
+BUFFER_RECORDS = 1024 # records packed in memory before they are appended
+FLUSH_INTERVAL = 1.0 # seconds a record may wait in memory before it is written
+
+
+class Journal:
+    """Appends records; one instance per file, used from the event loop thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        base = 0.0
+        if not new:
+            _, _, _, self.wall_origin = read_header(path)
+            count = (os.path.getsize(path) - HEADER.size) // RECORD.itemsize
+            if count:
+                with open(path, 'rb') as f:
+                    f.seek(HEADER.size + (count - 1) * RECORD.itemsize)
+                    base = float(np.frombuffer(f.read(RECORD.itemsize), dtype=RECORD)['t'][0])
+        self._file = open(path, 'ab')
+        if new:
+            self.wall_origin = time.time()
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize, self.wall_origin))
+            self._file.flush()
+        else:
+            # Drop a record left half-written by a crash, so the next ones stay aligned
+            self._file.truncate(HEADER.size + count * RECORD.itemsize)
+        self.devices = read_devices(path)
+        self._device_ids = {udid: i for i, udid in enumerate(self.devices)}
+        self._buffer = np.zeros(BUFFER_RECORDS, dtype=RECORD)
+        self._count = 0
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self.written = 0
+
+        # This session's clock continues from the last record written
+        self.origin = time.monotonic() - base
+        self._buffer[0] = (base, time.time(), math.nan, 0, SOURCE_SESSION, b'')
+        self._count = 1
+
+    def _device_id(self, udid: str) -> int:
+        device = self._device_ids.get(udid)
+        if device is None:
+            device = self._device_ids[udid] = len(self.devices)
+            self.devices.append(udid)
+            # Rare (once per device); rewritten whole so it is never half-updated
+            tmp = f"{self.path}.devices.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.devices, f)
+            os.replace(tmp, f"{self.path}.devices")
+        return device
+
+    def record(self, udid: Optional[str], source: int, lat: float = math.nan, lon: float = math.nan):
+        self._buffer[self._count] = (time.monotonic() - self.origin, lat, lon, self._device_id(udid or ""), source, b'')
+        self._count += 1
+        if self._count == BUFFER_RECORDS:
+            self.flush()
+        elif self._flush_timer is None:
+            try:
+                self._flush_timer = asyncio.get_running_loop().call_later(FLUSH_INTERVAL, self.flush)
+            except RuntimeError:
+                self.flush() # no loop to flush later from
+
+    def flush(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self._count:
+            self._file.write(self._buffer[:self._count].tobytes())
+            self._file.flush()
+            self.written += self._count
+            self._count = 0
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def read_header(path: str) -> tuple:
+    with open(path, 'rb') as f:
+        data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: not a journal (too short)")
+    magic, version, record_size, wall_origin = HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.itemsize:
+        raise ValueError(f"{path}: not a version {VERSION} journal")
+    return magic, version, record_size, wall_origin
+
+
+def read_devices(path: str) -> list[str]:
+    try:
+        with open(f"{path}.devices", encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+class JournalReader:
+    """Memory-mapped, read-only view of a journal."""
+
+    def __init__(self, path: str):
+        self.path = path
+        _, _, _, self.wall_origin = read_header(path)
+        self.devices = read_devices(path)
+        # A record still being written when we opened the file is left out
+        count = (os.path.getsize(path) - HEADER.size) // RECORD.itemsize
+        self.records = (np.memmap(path, dtype=RECORD, mode='r', offset=HEADER.size, shape=(count,))
+                        if count else np.zeros(0, dtype=RECORD))
+        markers = self.records['source'] == SOURCE_SESSION
+        self.sessions = int(np.count_nonzero(markers))
+        # Wall-clock time of every record: its session's start plus the time since then
+        session = np.maximum(np.cumsum(markers) - 1, 0)
+        starts = self.records[markers]
+        offsets = starts['lat'] - starts['t'] if self.sessions else np.array([self.wall_origin])
+        self.wall = self.records['t'] + offsets[session]
+        self._sent = ~markers
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._sent))
+
+    def device_index(self, udid: Optional[str]) -> Optional[int]:
+        return self.devices.index(udid) if udid in self.devices else None
+
+    def _mask(self, udid: Optional[str]) -> np.ndarray:
+        if udid is None:
+            return self._sent
+        device = self.device_index(udid)
+        if device is None:
+            return np.zeros(len(self.records), dtype=bool)
+        return self._sent & (self.records['device'] == device)
+
+    def select(self, udid: Optional[str] = None) -> np.ndarray:
+        """Locations sent to one device (to all when udid is None), session records left out."""
+        return self.records[self._mask(udid)]
+
+    def summary(self) -> dict:
+        records = self.select()
+        by_device = {udid: int(n) for udid, n in zip(self.devices, np.bincount(records['device'], minlength=len(self.devices)))}
+        by_source = {name: int(np.count_nonzero(records['source'] == code)) for code, name in SOURCES.items()}
+        return {
+            "records": len(records),
+            "sessions": self.sessions,
+            "started": self.wall_origin,
+            "duration": float(records['t'][-1] - records['t'][0]) if len(records) else 0.0,
+            "devices": by_device,
+            "sources": by_source,
+        }
+
+    def export_gpx(self, gpx_path: str, udid: Optional[str] = None) -> int:
+        """Writes the positions sent (clears left out) as a timestamped GPX track; returns the point count."""
+        from preprocess import from_columns
+        from route import write_gpx
+
+        mask = self._mask(udid) & (self.records['source'] != SOURCE_CLEAR)
+        points = self.records[mask]
+        write_gpx(from_columns(points['lat'], points['lon'], t=self.wall[mask]), gpx_path)
+        return len(points)
+
+    async def replay(self, send: Callable[[str, int, float, float], Awaitable], speed: float = 1.0,
+                     udid: Optional[str] = None):
+        """Re-sends the records with their original spacing (divided by speed) on a monotonic clock."""
+        records = self.select(udid)
+        if not len(records):
+            return
+        times = (records['t'] - records['t'][0]) / speed
+        start = time.monotonic()
+        for i in range(len(records)):
+            await wait_until(start + times[i])
+            record = records[i]
+            await send(self.devices[record['device']], int(record['source']), float(record['lat']), float(record['lon']))
+
+
+def diff(a: JournalReader, b: JournalReader, udid: Optional[str] = None) -> dict:
+    """Compares the location sequences of two journals record by record."""
+    ra, rb = a.select(udid), b.select(udid)
+    n = min(len(ra), len(rb))
+    result = {"records": (len(ra), len(rb)), "compared": n, "first_difference": None,
+              "max_distance_m": 0.0, "max_timing_error_s": 0.0}
+    if not n:
+        return result
+    ra, rb = ra[:n], rb[:n]
+    same_source = ra['source'] == rb['source']
+    # Coordinates compare equal when both are NaN (clears)
+    same_position = (np.isclose(ra['lat'], rb['lat'], rtol=0, atol=1e-9, equal_nan=True) &
+                     np.isclose(ra['lon'], rb['lon'], rtol=0, atol=1e-9, equal_nan=True))
+    different = np.flatnonzero(~(same_source & same_position))
+    if len(different):
+        result["first_difference"] = int(different[0])
+    result["differences"] = int(len(different))
+
+    with np.errstate(invalid='ignore'):
+        dlat = np.radians(rb['lat'] - ra['lat'])
+        dlon = np.radians(rb['lon'] - ra['lon']) * np.cos(np.radians(ra['lat']))
+        distance = np.hypot(dlat, dlon) * 6_371_000.0
+    if np.isfinite(distance).any():
+        result["max_distance_m"] = float(np.nanmax(distance))
+    timing = (rb['t'] - rb['t'][0]) - (ra['t'] - ra['t'][0])
+    result["max_timing_error_s"] = float(np.abs(timing).max())
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect, export and compare iGeoFake location journals')
+    sub = parser.add_subparsers(dest='command', required=True)
+    show = sub.add_parser('show', help='Summarize a journal')
+    show.add_argument('journal')
+    export = sub.add_parser('export', help='Write the positions sent as GPX')
+    export.add_argument('journal')
+    export.add_argument('gpx')
+    export.add_argument('--device', help='UDID (default: every device)')
+    compare = sub.add_parser('diff', help='Compare two journals record by record')
+    compare.add_argument('a')
+    compare.add_argument('b')
+    compare.add_argument('--device', help='UDID (default: every device)')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'show':
+            print(json.dumps(JournalReader(args.journal).summary(), indent=2))
+        elif args.command == 'export':
+            count = JournalReader(args.journal).export_gpx(args.gpx, args.device)
+            print(f"Wrote {count} points to {args.gpx}")
+        else:
+            result = diff(JournalReader(args.a), JournalReader(args.b), args.device)
+            print(json.dumps(result, indent=2))
+            return 0 if result["first_difference"] is None and result["records"][0] == result["records"][1] else 1
+    except (OSError, ValueError) as e:
+        print(f"journal: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Long-lived location simulation worker.
+
+Opens one DVT channel to an RSD endpoint and keeps it open, applying
+coordinate updates read from stdin (one command per line):
+
+    set <LAT> <LON>
+    clear
+    quit
+
+Prints READY once the channel is up, then acknowledges every command with
+"OK <command>" or "ERR <reason>" on stdout.
+
+Usage: python location_worker.py --rsd <IP> <PORT>
+"""
+import asyncio
+import sys
+
+
+def reply(message: str):
+    print(message)
+    sys.stdout.flush()
+
+
+def serve(location_simulation):
+    reply("READY")
+    for raw in sys.stdin:
+        parts = raw.split()
+        if not parts:
+            continue
+        command = parts[0]
+        try:
+            if command == "set" and len(parts) == 3:
+                location_simulation.set(float(parts[1]), float(parts[2]))
+                reply(f"OK set {parts[1]} {parts[2]}")
+            elif command == "clear":
+                location_simulation.clear()
+                reply("OK clear")
+            elif command == "quit":
+                reply("OK quit")
+                return
+            else:
+                reply(f"ERR unknown command: {raw.strip()}")
+        except Exception as e:
+            reply(f"ERR {command}: {e}")
+
+
+def main():
+    if len(sys.argv) != 4 or sys.argv[1] != "--rsd":
+        print("Usage: location_worker.py --rsd <IP> <PORT>")
+        sys.exit(1)
+
+    rsd_ip, rsd_port = sys.argv[2], int(sys.argv[3])
+
+    # Imported lazily so that `--help`-style misuse fails fast
+    from pymobiledevice3.remote.remote_service_discovery import RemoteServiceDiscoveryService
+    from pymobiledevice3.services.dvt.dvt_secure_socket_proxy import DvtSecureSocketProxyService
+    from pymobiledevice3.services.dvt.instruments.location_simulation import LocationSimulation
+
+    rsd = RemoteServiceDiscoveryService((rsd_ip, rsd_port))
+    asyncio.run(rsd.connect())
+    with DvtSecureSocketProxyService(rsd) as dvt:
+        serve(LocationSimulation(dvt))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Batched, bounded log delivery from subprocess streams to the UI.
+
+Lines are appended to a ring buffer per source and handed to the sink in
+coalesced batches, at most every `flush_interval` seconds or as soon as
+`max_batch` lines are pending. When a source outpaces the UI its ring
+buffer overwrites the oldest lines and the drop count is reported as a
+single summary line instead, so a flood costs near-constant work per
+flush. Optionally every line is also written to a rotating log file by a
+background thread.
+"""
+import asyncio
+import itertools
+import logging
+import logging.handlers
+import queue
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import metrics
+
+FLUSH_INTERVAL = 0.1 # seconds
+MAX_BATCH = 200 # lines per flush
+BUFFER_LINES = 2000 # ring buffer size per source
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+
+class _LineListener(logging.handlers.QueueListener):
+    def prepare(self, item):
+        created, line = item
+        record = logging.makeLogRecord({'msg': line, 'levelno': logging.INFO, 'levelname': 'INFO'})
+        record.created = created
+        record.msecs = (created % 1) * 1000
+        return record
+
+
+class LogPipeline:
+    def __init__(self, sink: Callable[[str], None], flush_interval: float = FLUSH_INTERVAL,
+                 max_batch: int = MAX_BATCH, buffer_lines: int = BUFFER_LINES,
+                 log_file: Optional[str] = None):
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.buffer_lines = buffer_lines
+
+        self.buffers: dict[str, deque] = {}
+        self.dropped: dict[str, int] = {}
+        self.lines_in = 0
+        self.lines_dropped = 0
+        self._pending = 0
+        self._seq = itertools.count()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self._file_queue: Optional[queue.SimpleQueue] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        if log_file:
+            self._open_log_file(log_file)
+
+    def _open_log_file(self, log_file: str):
+        # The listener thread builds records and does the disk I/O; the
+        # event loop only enqueues (timestamp, line) tuples
+        handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        self._file_queue = queue.SimpleQueue()
+        self._listener = _LineListener(self._file_queue, handler)
+        self._listener.start()
+
+    def push(self, source: str, line: str):
+        self.lines_in += 1
+        metrics.LOG_LINES_IN.inc()
+        if self._file_queue is not None:
+            self._file_queue.put((time.time(), line))
+
+        buf = self.buffers.get(source)
+        if buf is None:
+            buf = self.buffers[source] = deque(maxlen=self.buffer_lines)
+        if len(buf) == buf.maxlen:
+            # Oldest line is overwritten; it will only show up in the summary
+            self.dropped[source] = self.dropped.get(source, 0) + 1
+            self.lines_dropped += 1
+            metrics.LOG_LINES_DROPPED.inc(source=source)
+        else:
+            self._pending += 1
+        buf.append((next(self._seq), line))
+
+        if self._task is None:
+            try:
+                self._task = asyncio.get_running_loop().create_task(self._run())
+            except RuntimeError:
+                # No event loop yet (e.g. during start-up): deliver directly
+                self.flush()
+                return
+        if self._pending >= self.max_batch:
+            self._wake.set()
+
+    def flush(self):
+        """Delivers up to max_batch pending lines, oldest first, as one sink call."""
+        if not self._pending and not self.dropped:
+            return
+
+        batch = []
+        for source, count in self.dropped.items():
+            batch.append((-1, f"WARNING: dropped {count} log lines from {source}"))
+        self.dropped.clear()
+
+        taken = 0
+        while taken < self.max_batch and self._pending:
+            # Oldest head across all sources
+            source = min((s for s in self.buffers if self.buffers[s]), key=lambda s: self.buffers[s][0][0])
+            batch.append(self.buffers[source].popleft())
+            self._pending -= 1
+            taken += 1
+
+        self.sink("\n".join(line for _, line in batch))
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass # a broken sink must not kill log delivery
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._pending or self.dropped:
+            self.flush()
+        if self._listener:
+            self._listener.stop()
+            self._listener = None
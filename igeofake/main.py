@@ -1,100 +1,29 @@
-from nicegui import ui, app
+import sys
+if __name__ == '__main__' and '--headless' in sys.argv:
+    # API only: skip importing and building the UI entirely
+    import api
+    sys.exit(api.main())
+
+from nicegui import ui, app, Client
+from nicegui import run as nicegui_run
+from fastapi.responses import PlainTextResponse
 import asyncio
-from process_manager import ProcessManager, STATE_STOPPED, STATE_CONNECTED, STATE_SIMULATING, STATE_ERROR, STATE_STARTING, STATE_TUNNEL_A_RUNNING
-
-# Global Manager Instance
+import os
+import metrics
+from api import create_router, make_executor
+from control_socket import ControlServer
+from noise import NoiseModel
+from process_manager import ProcessManager
+from route import save_stream
+from shared_state import SharedState, POSITION_RATE_HZ, STATUS_CLASSES
+
+UPLOAD_DIR = 'uploads'
+FOLLOW_RATE_HZ = 10 # default device updates per second while dragging in follow mode
+ROUTE_LIST_LIMIT = 5000 # routes offered in the picker, newest (or nearest) first
+
+# One manager and one shared state for the host; every tab is a view on them
 manager: ProcessManager = None
-
-# UI Elements
-log_area = None
-status_label = None
-btn_tunnel_a = None
-btn_tunnel_b = None
-stop_btn = None
-set_loc_btn = None
-clear_loc_btn = None
-coord_input = None
-map_element = None
-map_marker = None
-# Route UI Elements
-gpx_upload = None
-play_route_btn = None
-noise_input = None
-uploaded_gpx_path = None
-
-def on_log(message: str):
-    """Callback for appending logs."""
-    if log_area:
-        log_area.push(message)
-
-def on_status_change(new_state: str):
-    """Callback for status updates."""
-    if status_label:
-        status_label.set_text(f"Status: {new_state}")
-        status_label.classes(remove='text-red-500 text-green-500 text-blue-500 text-yellow-500 text-gray-500')
-
-        if new_state == STATE_STOPPED:
-            status_label.classes('text-gray-500')
-            btn_tunnel_a.enable()
-            btn_tunnel_b.disable()
-            stop_btn.disable()
-            set_loc_btn.disable()
-            clear_loc_btn.disable()
-            if play_route_btn: play_route_btn.disable()
-
-        elif new_state == STATE_TUNNEL_A_RUNNING:
-            status_label.classes('text-yellow-500')
-            btn_tunnel_a.disable()
-            btn_tunnel_b.enable()
-            stop_btn.enable()
-            set_loc_btn.disable()
-            clear_loc_btn.disable()
-            if play_route_btn: play_route_btn.disable()
-
-        elif new_state == STATE_STARTING:
-            status_label.classes('text-yellow-500')
-            btn_tunnel_a.disable()
-            btn_tunnel_b.disable()
-            stop_btn.enable()
-            set_loc_btn.disable()
-            clear_loc_btn.disable()
-            if play_route_btn: play_route_btn.disable()
-
-        elif new_state == STATE_CONNECTED:
-            status_label.classes('text-green-500')
-            btn_tunnel_a.disable()
-            btn_tunnel_b.disable()
-            stop_btn.enable()
-            set_loc_btn.enable()
-            clear_loc_btn.enable()
-            if play_route_btn and uploaded_gpx_path: play_route_btn.enable()
-
-        elif new_state == STATE_SIMULATING:
-            status_label.classes('text-blue-500')
-            btn_tunnel_a.disable()
-            btn_tunnel_b.disable()
-            stop_btn.enable()
-            set_loc_btn.enable()
-            clear_loc_btn.enable()
-            if play_route_btn and uploaded_gpx_path: play_route_btn.enable()
-
-        elif new_state == STATE_ERROR:
-            status_label.classes('text-red-500')
-            btn_tunnel_a.enable()
-            btn_tunnel_b.disable()
-            stop_btn.disable()
-            set_loc_btn.disable()
-            clear_loc_btn.disable()
-            if play_route_btn: play_route_btn.disable()
-
-async def handle_start_tunnel_a():
-    await manager.start_tunnel_a()
-
-async def handle_start_tunnel_b():
-    await manager.start_tunnel_b()
-
-async def handle_stop():
-    await manager.stop_services()
+shared = SharedState()
 
 def parse_coordinates(text: str):
     try:
@@ -107,95 +36,305 @@ def parse_coordinates(text: str):
         pass
     return None, None
 
-async def handle_set_location():
-    lat, lon = parse_coordinates(coord_input.value)
-    if lat is None or lon is None:
-        ui.notify('Invalid format. Use "Lat, Lon" (e.g., 25.03, 121.56)', type='warning')
-        return
-    await manager.set_location(str(lat), str(lon))
-
-async def handle_clear_location():
-    await manager.clear_location()
+def notify_fleet(results: list[dict]):
+    ok = [r for r in results if r['ok']]
+    if len(ok) == len(results):
+        ui.notify(f'Applied to {len(ok)} devices', type='positive')
+    else:
+        ui.notify(f'Applied to {len(ok)}/{len(results)} devices, see log', type='warning')
 
-async def handle_play_route():
-    if not uploaded_gpx_path:
-        ui.notify('Please upload a GPX file first.', type='warning')
-        return
-    noise_val = noise_input.value if noise_input.value else 500
-    await manager.play_route(uploaded_gpx_path, str(int(noise_val)))
-
-def handle_upload(e):
-    global uploaded_gpx_path
-    try:
-        # Save uploaded file
-        name = e.name
-        content = e.content.read()
-        # Save to local directory
-        # We can just save it as 'route.gpx' or keep original name
-        # Let's save as 'uploaded_route.gpx' to keep it simple and overwrite previous
-        uploaded_gpx_path = 'uploaded_route.gpx'
-        with open(uploaded_gpx_path, 'wb') as f:
-            f.write(content)
-
-        ui.notify(f'Uploaded {name}')
-        if manager.state in [STATE_CONNECTED, STATE_SIMULATING]:
-            play_route_btn.enable()
-
-    except Exception as ex:
-        ui.notify(f'Error uploading file: {ex}', type='negative')
-
-def update_map_from_input():
-    lat, lon = parse_coordinates(coord_input.value)
-    if lat is not None and lon is not None:
-        if map_marker:
-            map_marker.move(lat, lon)
-        map_element.center = (lat, lon)
-
-def handle_marker_drag(e):
-    try:
-        # Custom event structure from JavaScript
-        lat = e.args['lat']
-        lon = e.args['lng']
-        coord_input.value = f"{lat:.6f}, {lon:.6f}"
-        if manager:
-            manager.log(f"DEBUG: Marker dragged to {lat:.6f}, {lon:.6f}")
-    except Exception as ex:
-        if manager:
-            manager.log(f"ERROR in handle_marker_drag: {ex}")
-        pass
-
-def handle_map_click(e):
-    try:
-        lat = e.args['latlng']['lat']
-        lon = e.args['latlng']['lng']
-        coord_input.value = f"{lat:.6f}, {lon:.6f}"
-        if map_marker:
-            map_marker.move(lat, lon)
-    except Exception as ex:
-        if manager:
-            manager.log(f"ERROR in handle_map_click: {ex}, args: {e.args}")
-
-def handle_marker_drag(e):
-    """Handle marker drag events from JavaScript"""
-    try:
-        lat = e.args['lat']
-        lng = e.args['lng']
-        coord_input.value = f"{lat:.6f}, {lng:.6f}"
-        if manager:
-            manager.log(f"DEBUG: Marker dragged to {lat:.6f}, {lng:.6f}")
-    except Exception as ex:
-        if manager:
-            manager.log(f"ERROR in handle_marker_drag: {ex}, args: {e.args}")
+def get_manager() -> ProcessManager:
+    global manager
+    if not manager:
+        manager = ProcessManager(shared.on_log, shared.on_status,
+                                 position_callback=shared.on_position,
+                                 devices_callback=lambda udids: shared.on_devices(udids, manager.selected))
+    return manager
+
+
+class ClientView:
+    """The UI elements of one browser tab and their handlers."""
+
+    def __init__(self):
+        self.log_area = None
+        self.status_label = None
+        self.connect_btn = None
+        self.btn_tunnel_a = None
+        self.btn_tunnel_b = None
+        self.stop_btn = None
+        self.set_loc_btn = None
+        self.clear_loc_btn = None
+        self.coord_input = None
+        self.device_select = None
+        self.all_devices_switch = None
+        self.map_element = None
+        self.map_marker = None
+        self.follow_switch = None
+        self.follow_rate_input = None
+        # Route UI Elements
+        self.gpx_upload = None
+        self.route_select = None
+        self.near_switch = None
+        self.map_ready = False # route_overlay.js can be called once the page has loaded
+        self.play_route_btn = None
+        self.noise_input = None
+        self.seed_input = None
+        self.scatter_input = None
+        self.speed_input = None
+        self.simplify_input = None
+        self.pause_route_btn = None
+
+    def apply(self, diff: dict):
+        """Applies a SharedState diff; only the elements whose values changed are touched."""
+        if 'logs' in diff:
+            self.log_area.push(diff['logs'])
+        if 'status' in diff:
+            self.status_label.set_text(f"Status: {diff['status']}")
+        if 'status_class' in diff:
+            self.status_label.classes(remove=STATUS_CLASSES)
+            self.status_label.classes(diff['status_class'])
+        for key, element in (('tunnel_a', self.connect_btn), ('tunnel_a', self.btn_tunnel_a), ('tunnel_b', self.btn_tunnel_b),
+                             ('stop', self.stop_btn), ('set_location', self.set_loc_btn),
+                             ('clear_location', self.clear_loc_btn), ('play_route', self.play_route_btn)):
+            if key in diff:
+                element.set_enabled(diff[key])
+        if 'devices' in diff:
+            self.device_select.options = list(diff['devices'])
+        if 'devices' in diff or 'selected' in diff:
+            self.device_select.value = shared.selected
+            self.device_select.update()
+        if 'paused' in diff:
+            self.pause_route_btn.set_text('Resume' if diff['paused'] else 'Pause')
+        if 'library' in diff:
+            self.refresh_routes()
+        elif 'route_path' in diff:
+            self.route_select.value = diff['route_path'] if diff['route_path'] in self.route_select.options else None
+            self.route_select.update()
+        if 'route_path' in diff:
+            self.show_route_overlay()
+        if 'position' in diff and self.map_ready:
+            self.show_position(diff['position'], diff.get('position_interval', 0.0))
+
+    def run_javascript(self, code: str):
+        # Bound to this tab's client: updates also arrive from the player task, timers and the API,
+        # where ui.run_javascript has no client (or the wrong one) in context
+        self.map_element.client.run_javascript(code)
+
+    def show_position(self, position, interval: float):
+        """Moves the marker along the playing route; playback.js interpolates until the next update."""
+        if position is None:
+            self.run_javascript(f"clearPlaybackTrail({self.map_element.id});")
+        else:
+            self.run_javascript(f"showPlaybackPosition({self.map_element.id}, {position['lat']}, {position['lon']}, "
+                                f"{position['index']}, {interval * 1000:.0f});")
+
+    def show_route_overlay(self):
+        """Draws the current route on the map; the browser fetches the tier for its zoom itself."""
+        if not self.map_ready:
+            return
+        entry = manager.route_library.find(shared.route_path) if shared.route_path else None
+        if entry:
+            self.run_javascript(f"showRouteOverlay({self.map_element.id}, '/api/routes/{entry['id']}/polyline');")
+        else:
+            self.run_javascript(f"clearRouteOverlay({self.map_element.id});")
+
+    def refresh_routes(self):
+        """Re-lists the route library (metadata only, no GPX is read) into the picker."""
+        lat, lon = parse_coordinates(self.coord_input.value) if self.near_switch.value else (None, None)
+        if lat is not None:
+            entries = manager.route_library.near(lat, lon, limit=ROUTE_LIST_LIMIT)
+        else:
+            entries = manager.route_library.entries(limit=ROUTE_LIST_LIMIT)
+        self.route_select.options = {
+            entry['path']: f"{entry['name']} ({entry['length'] / 1000:.1f} km, {entry['points']} pts, "
+                           f"{entry['duration'] / 60:.0f} min)"
+            for entry in entries
+        }
+        self.route_select.value = shared.route_path if shared.route_path in self.route_select.options else None
+        self.route_select.update()
+
+    def handle_route_pick(self, e):
+        if e.value and e.value != shared.route_path:
+            shared.set_route(e.value, self.route_select.options[e.value].rsplit(' (', 1)[0])
+
+    def handle_device_select(self, e):
+        if manager and e.value and e.value != manager.selected:
+            manager.select_device(e.value)
+
+    async def handle_connect(self):
+        result = await manager.connect()
+        if result['ok']:
+            ui.notify(f"Connected in {max(result['stages'].values()) / 1000:.1f} s", type='positive')
+        else:
+            ui.notify(f"Connect failed: {result['error']}", type='negative')
+
+    async def handle_start_tunnel_a(self):
+        await manager.start_tunnel_a()
+
+    async def handle_start_tunnel_b(self):
+        await manager.start_tunnel_b()
+
+    async def handle_stop(self):
+        await manager.stop_services()
+
+    async def handle_set_location(self):
+        lat, lon = parse_coordinates(self.coord_input.value)
+        if lat is None or lon is None:
+            ui.notify('Invalid format. Use "Lat, Lon" (e.g., 25.03, 121.56)', type='warning')
+            return
+        if self.all_devices_switch.value:
+            notify_fleet(await manager.broadcast('set_location', str(lat), str(lon)))
+        else:
+            await manager.set_location(str(lat), str(lon))
+
+    async def handle_clear_location(self):
+        if self.all_devices_switch.value:
+            notify_fleet(await manager.broadcast('clear_location'))
+        else:
+            await manager.clear_location()
+
+    async def handle_play_route(self):
+        if not shared.route_path:
+            ui.notify('Please upload a GPX file first.', type='warning')
+            return
+        noise_val = self.noise_input.value if self.noise_input.value else 500
+        # An empty seed draws a fresh one (logged, so the run can be repeated)
+        seed = int(self.seed_input.value) if self.seed_input.value is not None else None
+        noise_model = NoiseModel(seed=seed, jitter_ms=int(noise_val), scatter_m=self.scatter_input.value or 0.0)
+        speed = self.speed_input.value or 1.0
+        if self.all_devices_switch.value:
+            notify_fleet(await manager.broadcast('play_route', shared.route_path, str(int(noise_val)),
+                                                 self.simplify_input.value or 0.0, 0.0, 0.0, noise_model, speed=speed))
+        else:
+            await manager.play_route(shared.route_path, str(int(noise_val)), tolerance=self.simplify_input.value or 0.0,
+                                     noise_model=noise_model, speed=speed)
+        if manager.player:
+            shared.set_paused(False)
+
+    def handle_pause_route(self):
+        fleet = self.all_devices_switch.value
+        player = manager.player
+        if player is None and fleet:
+            player = next((d.player for d in manager.devices.values() if d.player), None)
+        if not player:
+            return
+        # The whole fleet follows the state of the selected (or first playing) device
+        paused = not player.paused
+        if paused:
+            manager.pause_route(fleet=fleet)
+        else:
+            manager.resume_route(fleet=fleet)
+        shared.set_paused(paused)
+
+    def handle_speed_change(self):
+        if manager and self.speed_input.value:
+            manager.set_route_speed(self.speed_input.value, fleet=self.all_devices_switch.value)
+
+    async def handle_upload(self, e):
+        try:
+            # Stream the upload to disk in chunks off the event loop, then file it
+            # under its content hash so earlier uploads stay available
+            name = e.name
+            os.makedirs(UPLOAD_DIR, exist_ok=True)
+            tmp_path = os.path.join(UPLOAD_DIR, f'upload-{id(self)}.part')
+            size, digest = await nicegui_run.io_bound(save_stream, e.content, tmp_path)
+            gpx_path = os.path.join(UPLOAD_DIR, f'{digest}.gpx')
+            os.replace(tmp_path, gpx_path)
+            if not await manager.add_route(gpx_path, name, digest):
+                ui.notify(f'Could not read {name}, see log', type='negative')
+                return
+
+            ui.notify(f'Uploaded {name} ({size / 1024 / 1024:.1f} MB)')
+            shared.set_route(gpx_path, name)
+            shared.library_changed()
+
+        except Exception as ex:
+            ui.notify(f'Error uploading file: {ex}', type='negative')
+
+    def update_map_from_input(self):
+        lat, lon = parse_coordinates(self.coord_input.value)
+        if lat is not None and lon is not None:
+            if self.map_marker:
+                self.map_marker.move(lat, lon)
+            self.map_element.center = (lat, lon)
+
+    def handle_map_click(self, e):
+        try:
+            lat = e.args['latlng']['lat']
+            lon = e.args['latlng']['lng']
+            self.coord_input.value = f"{lat:.6f}, {lon:.6f}"
+            if self.map_marker:
+                self.map_marker.move(lat, lon)
+            if self.near_switch.value:
+                self.refresh_routes()
+        except Exception as ex:
+            if manager:
+                manager.log(f"ERROR in handle_map_click: {ex}, args: {e.args}")
+
+    def handle_marker_drag(self, e):
+        """Handle marker drag events from JavaScript"""
+        try:
+            lat = e.args['lat']
+            lng = e.args['lng']
+            self.coord_input.value = f"{lat:.6f}, {lng:.6f}"
+            if manager:
+                manager.log(f"DEBUG: Marker dragged to {lat:.6f}, {lng:.6f}")
+            self.follow(lat, lng)
+            if self.near_switch.value:
+                self.refresh_routes()
+        except Exception as ex:
+            if manager:
+                manager.log(f"ERROR in handle_marker_drag: {ex}, args: {e.args}")
+
+    def handle_marker_move(self, e):
+        """Throttled positions sent by marker_drag.js while the marker is dragged"""
+        try:
+            self.follow(e.args['lat'], e.args['lng'])
+        except Exception as ex:
+            if manager:
+                manager.log(f"ERROR in handle_marker_move: {ex}, args: {e.args}")
+
+    def follow(self, lat: float, lon: float):
+        if not self.follow_switch.value or not manager or not manager.devices:
+            return
+        # Each device keeps only the newest coordinate, so a fast drag never backs up
+        udids = list(manager.devices) if self.all_devices_switch.value else [None]
+        for udid in udids:
+            manager.follow_location(f"{lat:.6f}", f"{lon:.6f}", udid)
+
+    def handle_follow_change(self):
+        hz = (self.follow_rate_input.value or 0) if self.follow_switch.value else 0
+        self.run_javascript(f'setMarkerFollowRate({self.map_element.id}, {float(hz)});')
+
+
+@app.get('/metrics')
+def metrics_endpoint():
+    # Prometheus scrape target
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
+# REST/WebSocket control on the same manager the tabs use
+app.include_router(create_router(get_manager, shared))
+
+# ... and the local socket cli.py talks to
+control = ControlServer(make_executor(get_manager, shared), log=lambda message: get_manager().log(message))
+app.on_startup(control.start)
+
+def shutdown():
+    # NiceGUI does not wait for async shutdown handlers, so clean up synchronously.
+    # The tunnels run in their own process groups and would outlive us otherwise
+    control.close()
+    if manager:
+        manager.processes.terminate_all()
+        manager.close_journal()
+        manager.route_library.close()
+
+app.on_shutdown(shutdown)
 
 
 @ui.page('/')
-def main_page():
-    global log_area, status_label, btn_tunnel_a, btn_tunnel_b, stop_btn, set_loc_btn, clear_loc_btn, coord_input, manager, map_element, map_marker
-    global gpx_upload, play_route_btn, noise_input
-
+def main_page(client: Client):
     # Initialize Manager
-    if not manager:
-        manager = ProcessManager(on_log, on_status_change)
+    get_manager()
 
     # Admin Check on Startup
     if not manager.check_admin():
@@ -203,96 +342,188 @@ def main_page():
         ui.label('Please restart the application with "Run as Administrator".').classes('text-xl m-4')
         return
 
+    view = ClientView()
+
     # Layout
     with ui.column().classes('w-full h-full p-4'):
         ui.label('iGeoFake - iOS Location Simulator').classes('text-2xl font-bold mb-4')
 
-        status_label = ui.label(f'Status: {manager.state}').classes('text-xl font-bold text-gray-500 mb-4')
+        view.status_label = ui.label(f'Status: {manager.state}').classes('text-xl font-bold text-gray-500 mb-4')
 
         with ui.row().classes('w-full gap-4'):
-            btn_tunnel_a = ui.button('Start Remote Tunneld', on_click=handle_start_tunnel_a)
-            btn_tunnel_b = ui.button('Start Lockdown Tunnel', on_click=handle_start_tunnel_b)
-            btn_tunnel_b.disable()
+            view.connect_btn = ui.button('Connect', on_click=view.handle_connect).props('color=green')
+            view.btn_tunnel_a = ui.button('Start Remote Tunneld', on_click=view.handle_start_tunnel_a)
+            view.btn_tunnel_b = ui.button('Start Lockdown Tunnel', on_click=view.handle_start_tunnel_b)
+            view.btn_tunnel_b.disable()
             
-            stop_btn = ui.button('Stop Services', on_click=handle_stop).props('color=red')
-            stop_btn.disable()
+            view.stop_btn = ui.button('Stop Services', on_click=view.handle_stop).props('color=red')
+            view.stop_btn.disable()
+
+            view.device_select = ui.select(
+                list(manager.devices),
+                value=manager.selected,
+                label='Device',
+                on_change=view.handle_device_select
+            ).classes('w-72')
+            view.all_devices_switch = ui.switch('All devices')
 
         with ui.row().classes('w-full gap-4 mt-4 items-center'):
-            coord_input = ui.input(
+            view.coord_input = ui.input(
                 label='Coordinates (Lat, Lon)', 
                 value='25.033000, 121.565400',
-                on_change=update_map_from_input
+                on_change=view.update_map_from_input
             ).classes('w-96').props('clearable')
             
-            set_loc_btn = ui.button('Set Location', on_click=handle_set_location)
-            set_loc_btn.disable()
-            clear_loc_btn = ui.button('Clear Location', on_click=handle_clear_location).props('outline')
-            clear_loc_btn.disable()
+            view.set_loc_btn = ui.button('Set Location', on_click=view.handle_set_location)
+            view.set_loc_btn.disable()
+            view.clear_loc_btn = ui.button('Clear Location', on_click=view.handle_clear_location).props('outline')
+            view.clear_loc_btn.disable()
+
+            # Follow mode: dragging the marker moves the device live
+            view.follow_switch = ui.switch('Follow marker', on_change=view.handle_follow_change)
+            view.follow_rate_input = ui.number(
+                label='Rate (Hz)',
+                value=FOLLOW_RATE_HZ,
+                min=1,
+                max=30,
+                on_change=view.handle_follow_change
+            ).classes('w-24')
 
         # Route Simulation
         ui.label('Route Simulation (GPX)').classes('font-bold mt-4')
         with ui.row().classes('w-full gap-4 items-center'):
-            gpx_upload = ui.upload(
+            view.gpx_upload = ui.upload(
                 label='Upload GPX',
-                on_upload=handle_upload,
+                on_upload=view.handle_upload,
                 max_files=1,
                 auto_upload=True
             ).props('accept=.gpx').classes('w-64')
 
-            noise_input = ui.number(
+            view.route_select = ui.select(
+                options={},
+                label='Route Library',
+                with_input=True,
+                on_change=view.handle_route_pick
+            ).classes('w-72')
+
+            view.near_switch = ui.switch(
+                'Near marker',
+                on_change=lambda: view.refresh_routes()
+            )
+
+            view.noise_input = ui.number(
                 label='Timing Noise (ms)',
                 value=500,
                 min=0,
                 max=5000
             ).classes('w-40')
 
-            play_route_btn = ui.button('Play Route', on_click=handle_play_route)
-            play_route_btn.disable()
+            view.seed_input = ui.number(
+                label='Seed',
+                value=None,
+                min=0,
+                format='%d'
+            ).classes('w-32')
+
+            view.scatter_input = ui.number(
+                label='Scatter (m)',
+                value=0,
+                min=0,
+                max=100
+            ).classes('w-32')
+
+            view.simplify_input = ui.number(
+                label='Simplify (m)',
+                value=0,
+                min=0,
+                max=100
+            ).classes('w-32')
+
+            view.speed_input = ui.number(
+                label='Speed (x)',
+                value=1.0,
+                min=0.1,
+                max=50,
+                step=0.1,
+                on_change=view.handle_speed_change
+            ).classes('w-32')
+
+            view.play_route_btn = ui.button('Play Route', on_click=view.handle_play_route)
+            view.play_route_btn.disable()
+            view.pause_route_btn = ui.button('Pause', on_click=view.handle_pause_route).props('outline')
 
         # Map
         with ui.card().classes('w-full h-96 mt-4 p-0'):
-            map_element = ui.leaflet(center=(25.0330, 121.5654), zoom=13).classes('w-full h-full')
-            map_marker = map_element.marker(latlng=(25.0330, 121.5654), options={'draggable': True})
-            map_element.on('marker-drag', handle_marker_drag)
+            view.map_element = ui.leaflet(center=(25.0330, 121.5654), zoom=13).classes('w-full h-full')
+            view.map_marker = view.map_element.marker(latlng=(25.0330, 121.5654), options={'draggable': True})
+            # marker_drag.js emits these on the page, not on the map element
+            ui.on('marker-drag', view.handle_marker_drag)
+            ui.on('marker-move', view.handle_marker_move)
             
             # Bind dragend event using external JavaScript file
-            map_id = map_element.id
+            map_id = view.map_element.id
             
             # Add the JavaScript file to the page
             ui.add_head_html('<script src="/static/marker_drag.js"></script>')
+            ui.add_head_html('<script src="/static/route_overlay.js"></script>')
+            ui.add_head_html('<script src="/static/playback.js"></script>')
             
             # Call the function after a delay to ensure everything is loaded
             def bind_drag_events():
                 if manager:
                     manager.log(f"DEBUG: Calling bindMarkerDragEvents for map ID: {map_id}")
                 ui.run_javascript(f'bindMarkerDragEvents({map_id});')
+                view.handle_follow_change()
+                view.map_ready = True
+                view.show_route_overlay()
+                if shared.position is not None:
+                    view.show_position(shared.position, shared.position_interval)
             
             ui.timer(0.5, bind_drag_events, once=True)
 
         ui.label('Process Logs:').classes('font-bold mt-4')
-        log_area = ui.log(max_lines=1000).classes('w-full h-64 border p-2 bg-gray-100 font-mono text-sm')
+        view.log_area = ui.log(max_lines=1000).classes('w-full h-64 border p-2 bg-gray-100 font-mono text-sm')
 
-    # Initial State Sync
-    on_status_change(manager.state)
+    # Initial state sync, then diffs until the tab goes away
+    shared.subscribe(view.apply, alive=lambda: client.id in Client.instances)
+    client.on_disconnect(lambda: shared.unsubscribe(view.apply))
 
-def run():
+def run(host: str = '127.0.0.1'):
     from pathlib import Path
     # Mount static files directory
     app.add_static_files('/static', Path(__file__).parent / 'static')
-    ui.run(title='iGeoFake', reload=False, port=8080)
+    # Loopback by default: /api has no authentication and takes server-side file paths
+    ui.run(title='iGeoFake', reload=False, host=host, port=8080)
 
 if __name__ in {"__main__", "__mp_main__"}:
     import argparse
-    import os
     
     parser = argparse.ArgumentParser(description='iGeoFake - iOS Location Simulator')
     parser.add_argument('--mock', action='store_true', 
                         help='Run in mock mode (no admin required, for development/testing)')
+    parser.add_argument('--log-file', metavar='PATH',
+                        help='Also write all process logs to a rotating log file')
+    parser.add_argument('--position-rate', type=float, metavar='HZ', default=POSITION_RATE_HZ,
+                        help='Playback position updates pushed to each browser per second')
+    parser.add_argument('--journal', metavar='PATH',
+                        help='Record every location sent to a device (see journal.py)')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Address to listen on; the UI and /api are unauthenticated, so only '
+                             'expose them (e.g. 0.0.0.0) on a trusted network')
+    parser.add_argument('--headless', action='store_true',
+                        help='Serve only the REST/WebSocket API under /api, without the UI')
     args = parser.parse_args()
+
+    if args.log_file:
+        os.environ['IGEOFAKE_LOG_FILE'] = args.log_file
+    if args.journal:
+        os.environ['IGEOFAKE_JOURNAL'] = args.journal
+    if args.position_rate > 0:
+        shared.position_interval = 1.0 / args.position_rate
     
     if args.mock:
         os.environ['IGEOFAKE_MOCK'] = '1'
         print("Running in MOCK MODE - no admin required")
     
-    run()
+    run(args.host)
 
@@ -0,0 +1,188 @@
+"""In-process counters, histograms and timing spans, rendered as Prometheus text.
+
+Metrics live in a module-level registry so any module can record into
+them without plumbing; main.py serves render() on /metrics.
+"""
+import functools
+import math
+import threading
+import time
+from typing import Optional
+
+# Seconds; spans cover everything from a 0.1 ms session write to a slow tunnel start
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DURATION_BUCKETS = (1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 4 * 3600.0, 12 * 3600.0)
+
+REGISTRY: list["_Metric"] = []
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: tuple, extra: Optional[tuple] = None) -> str:
+    pairs = key + (extra or ())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+        # label key -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            else:
+                row[len(self.buckets)] += 1
+            row[-1] += value
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._values.items()]
+        lines = []
+        for key, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), row[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+PROCESS_SPAWNS = Counter("igeofake_process_spawns_total", "Subprocesses started, by process.")
+PROCESS_KILLS = Counter("igeofake_process_kills_total", "Subprocesses terminated on purpose.")
+PROCESS_FORCED_KILLS = Counter("igeofake_process_forced_kills_total",
+                               "Subprocesses that ignored terminate and were force-killed.")
+RSD_UPDATES = Counter("igeofake_rsd_updates_total", "RSD endpoint changes picked up.")
+STATE_TRANSITIONS = Counter("igeofake_state_transitions_total", "State machine transitions.")
+STATE_SECONDS = Histogram("igeofake_state_seconds", "Time spent in a state before leaving it.", DURATION_BUCKETS)
+SIMULATION_SECONDS = Histogram("igeofake_simulation_seconds",
+                               "Duration of a device's simulation (Simulating until it stops).", DURATION_BUCKETS)
+LOG_LINES_IN = Counter("igeofake_log_lines_total", "Log lines received from processes and the app.")
+LOG_LINES_DROPPED = Counter("igeofake_log_lines_dropped_total", "Log lines dropped by the UI log pipeline.")
+TUNNEL_RECOVERIES = Counter("igeofake_tunnel_recoveries_total", "Supervisor tunnel restarts, by trigger.")
+HEALTH_PROBE_FAILURES = Counter("igeofake_health_probe_failures_total", "RSD health probes that failed.")
+FOLLOW_COALESCED = Counter("igeofake_follow_coalesced_total",
+                           "Dragged marker positions superseded before they were sent.")
+POSITION_COALESCED = Counter("igeofake_position_coalesced_total",
+                             "Playback positions superseded before they were pushed to the browsers.")
+OPERATION_SECONDS = Histogram("igeofake_operation_seconds", "Latency of ProcessManager operations.")
+OPERATION_ERRORS = Counter("igeofake_operation_errors_total", "ProcessManager operations that raised or reported failure.")
+SCENARIO_STEP_LATENESS = Histogram("igeofake_scenario_step_lateness_seconds",
+                                   "How late scenario steps started against their planned time.")
+
+
+class span:
+    """Times a block (sync or async) into OPERATION_SECONDS{operation=...}.
+
+        async with span("session_start"):
+            ...
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        OPERATION_SECONDS.observe(time.perf_counter() - self.started, operation=self.operation)
+        if exc_type is not None:
+            OPERATION_ERRORS.inc(operation=self.operation)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+def timed(operation: str):
+    """Decorator form of span for coroutine functions.
+
+    A False return value also counts as an error, since the Device actions
+    report failure that way instead of raising.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(operation):
+                result = await func(*args, **kwargs)
+            if result is False:
+                OPERATION_ERRORS.inc(operation=operation)
+            return result
+        return wrapper
+    return decorator
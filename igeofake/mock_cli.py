@@ -1,58 +1,194 @@
+"""Stand-in for the pymobiledevice3 CLI, used in mock mode.
+
+Faults and load are injected through environment variables, which the
+ProcessManager passes on to every process it spawns. Each one can be
+limited to a single mode by appending the mode name, e.g.
+IGEOFAKE_MOCK_CRASH_AFTER_TUNNEL_A=5 only crashes Tunnel A.
+
+    IGEOFAKE_MOCK_DEVICES           devices announced by tunnel_a (default 1)
+    IGEOFAKE_MOCK_DELAY             startup delay in seconds
+    IGEOFAKE_MOCK_JITTER            extra random startup delay, 0..N seconds
+    IGEOFAKE_MOCK_LOG_RATE          background log lines per second
+    IGEOFAKE_MOCK_LOG_SIZE          payload bytes per background log line (default 80)
+    IGEOFAKE_MOCK_CRASH_AFTER       exit after N seconds...
+    IGEOFAKE_MOCK_EXIT_CODE         ...with this exit code (default 1)
+    IGEOFAKE_MOCK_IGNORE_SIGTERM    1: ignore SIGTERM so only a forced kill works (POSIX only)
+    IGEOFAKE_MOCK_RSD_CHANGE_AFTER  tunnels announce a new RSD port every N seconds
+
+tunnel_a also serves a stand-in for the tunneld HTTP API on
+IGEOFAKE_TUNNELD_PORT (default 49151), listing the same devices.
+"""
 import sys
 import time
 import argparse
 import random
 import signal
 import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-def mock_tunnel_a():
-    print("INFO:     Started server process [26252]")
-    print("INFO:     Waiting for application startup.")
-    print("INFO:     Application startup complete.")
-    print("INFO:     Uvicorn running on http://127.0.0.1:49151 (Press CTRL+C to quit)")
-    print("2025-12-03 22:16:32 9950X3D pymobiledevice3.tunneld.server[26252] INFO [start-tunnel-task-usbmux-00008150-001E6CE20228401C-USB] Created tunnel --rsd fdae:4871:a659::1 55082")
-    sys.stdout.flush()
+DEFAULT_DELAYS = {"tunnel_b": 2.0} # seconds before the banner, as the real tools take a while
+
+TUNNELD_PORT = int(os.environ.get('IGEOFAKE_TUNNELD_PORT', '49151'))
+
+# Background threads and the mode itself share stdout
+_print_lock = threading.Lock()
+
+# udid -> (address, port), as served by the mock tunneld API
+tunneld_devices = {}
+
+
+def emit(*lines):
+    with _print_lock:
+        sys.stdout.write("".join(f"{line}\n" for line in lines))
+        sys.stdout.flush()
+
+
+def setting(name, mode, default=None):
+    """Reads IGEOFAKE_MOCK_<NAME>_<MODE>, falling back to IGEOFAKE_MOCK_<NAME>."""
+    value = os.environ.get(f"IGEOFAKE_MOCK_{name}_{mode.upper()}", os.environ.get(f"IGEOFAKE_MOCK_{name}"))
+    return default if value in (None, "") else value
+
+
+def _log_load(rate, size):
+    # Emits in 10 ms ticks so high rates don't need one write per line
+    payload = "x" * size
+    started = time.monotonic()
+    sent = 0
     while True:
-        time.sleep(1)
+        due = int((time.monotonic() - started) * rate)
+        if due > sent:
+            emit(*(f"LOAD {seq} {payload}" for seq in range(sent, due)))
+            sent = due
+        time.sleep(0.01)
 
-def mock_tunnel_b():
-    print("2025-12-03 22:16:56 9950X3D pymobiledevice3.cli.remote[31416] INFO tunnel created")
-    print("Identifier: 00008150-001E6CE20228401C")
-    print("Interface: pymobiledevice3-tunnel-00008150-001E6CE20228401C")
-    print("Protocol: TunnelProtocol.TCP")
-    print("RSD Address: fd0b:d15a:eebf::1")
-    print("RSD Port: 55083")
-    print("Use the follow connection option:")
-    print("--rsd fd0b:d15a:eebf::1 55083")
-    sys.stdout.flush()
+
+def _crash(after, code):
+    time.sleep(after)
+    emit(f"CRASH: exiting with code {code} after {after:g} s")
+    os._exit(code)
+
+
+def _rsd_changes(mode, every):
+    # Same device, new endpoint: what a tunnel restart on the device side looks like
+    n = 0
     while True:
-        time.sleep(1)
+        time.sleep(every)
+        n += 1
+        if mode == "tunnel_a":
+            if "00008150-001E6CE20228401C" in tunneld_devices:
+                tunneld_devices["00008150-001E6CE20228401C"] = ("fdae:4871:a659::1", 55082 + n * 100)
+            emit(f"2025-12-03 22:16:32 9950X3D pymobiledevice3.tunneld.server[26252] INFO [start-tunnel-task-usbmux-00008150-001E6CE20228401C-USB] Created tunnel --rsd fdae:4871:a659::1 {55082 + n * 100}")
+        else:
+            emit(f"--rsd fd0b:d15a:eebf::1 {55083 + n * 100}")
+
+
+def inject_faults(mode):
+    """Applies the configured delay, then starts the load/crash/RSD threads for this mode."""
+    if setting("IGNORE_SIGTERM", mode) == "1" and hasattr(signal, "SIGTERM") and sys.platform != "win32":
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    delay = float(setting("DELAY", mode, DEFAULT_DELAYS.get(mode, 0.0)))
+    delay += random.uniform(0.0, float(setting("JITTER", mode, 0.0)))
+    if delay > 0:
+        time.sleep(delay)
+
+    rate = float(setting("LOG_RATE", mode, 0.0))
+    if rate > 0:
+        size = int(setting("LOG_SIZE", mode, 80))
+        threading.Thread(target=_log_load, args=(rate, size), daemon=True).start()
+
+    crash_after = setting("CRASH_AFTER", mode)
+    if crash_after is not None:
+        code = int(setting("EXIT_CODE", mode, 1))
+        threading.Thread(target=_crash, args=(float(crash_after), code), daemon=True).start()
+
+    rsd_every = setting("RSD_CHANGE_AFTER", mode)
+    if rsd_every is not None and mode in ("tunnel_a", "tunnel_b"):
+        threading.Thread(target=_rsd_changes, args=(mode, float(rsd_every)), daemon=True).start()
+
+
+class TunneldHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, like uvicorn
 
-def mock_set_location(lat, lon):
-    print(f"Setting location to LAT:{lat}, LON:{lon}")
-    print("Press ENTER to exit>\\")
-    sys.stdout.flush()
-    # Simulate blocking process
+    def do_GET(self):
+        body = json.dumps({
+            udid: [{"tunnel-address": address, "tunnel-port": port, "interface": f"utun{i + 5}"}]
+            for i, (udid, (address, port)) in enumerate(list(tunneld_devices.items()))
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # stdout is the tunnel log
+
+
+def serve_tunneld():
+    try:
+        server = ThreadingHTTPServer(("127.0.0.1", TUNNELD_PORT), TunneldHandler)
+    except OSError as e:
+        emit(f"ERROR:    [Errno {e.errno}] error while attempting to bind on address ('127.0.0.1', {TUNNELD_PORT})")
+        return
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+def mock_tunnel_a():
+    emit("INFO:     Started server process [26252]",
+         "INFO:     Waiting for application startup.",
+         "INFO:     Application startup complete.")
+    serve_tunneld()
+    emit(f"INFO:     Uvicorn running on http://127.0.0.1:{TUNNELD_PORT} (Press CTRL+C to quit)")
+    # IGEOFAKE_MOCK_DEVICES=N pretends N devices are attached (0: let Tunnel B find it)
+    for i in range(int(os.environ.get('IGEOFAKE_MOCK_DEVICES', '1'))):
+        if i == 0:
+            udid, address, port = "00008150-001E6CE20228401C", "fdae:4871:a659::1", 55082
+        else:
+            udid, address, port = f"00008150-{i:016X}", f"fdae:4871:a659::{i + 1:x}", 55082 + i * 2
+        tunneld_devices[udid] = (address, port)
+        emit(f"2025-12-03 22:16:32 9950X3D pymobiledevice3.tunneld.server[26252] INFO [start-tunnel-task-usbmux-{udid}-USB] Created tunnel --rsd {address} {port}")
     while True:
         time.sleep(1)
 
-def mock_play(gpx_path, noise):
-    print(f"Playing route from: {gpx_path}")
-    print(f"Timing noise: {noise}ms")
-    print("Press ENTER to exit>\\")
-    sys.stdout.flush()
-    # Simulate blocking process
+def mock_tunnel_b():
+    emit("2025-12-03 22:16:56 9950X3D pymobiledevice3.cli.remote[31416] INFO tunnel created",
+         "Identifier: 00008150-001E6CE20228401C",
+         "Interface: pymobiledevice3-tunnel-00008150-001E6CE20228401C",
+         "Protocol: TunnelProtocol.TCP",
+         "RSD Address: fd0b:d15a:eebf::1",
+         "RSD Port: 55083",
+         "Use the follow connection option:",
+         "--rsd fd0b:d15a:eebf::1 55083")
     while True:
         time.sleep(1)
 
+def mock_location_session(rsd_ip, rsd_port):
+    # Same line protocol as location_worker.py
+    emit(f"Connected to RSD {rsd_ip} {rsd_port}", "READY")
+    for raw in sys.stdin:
+        parts = raw.split()
+        if not parts:
+            continue
+        if parts[0] == "set" and len(parts) == 3:
+            emit(f"Setting location to LAT:{parts[1]}, LON:{parts[2]}", f"OK set {parts[1]} {parts[2]}")
+        elif parts[0] == "clear":
+            emit("OK clear")
+        elif parts[0] == "quit":
+            emit("OK quit")
+            return
+        else:
+            emit(f"ERR unknown command: {raw.strip()}")
+
 def mock_clear_location():
-    print("Clearing location...")
+    emit("Clearing location...")
     time.sleep(1)
-    print("Location cleared.")
+    emit("Location cleared.")
 
 def main():
-    # Ignore SIGTERM to simulate stubborn process if needed,
-    # but for now let's just run.
     parser = argparse.ArgumentParser()
     subparsers = parser.add_subparsers(dest='command')
 
@@ -66,44 +202,19 @@ def main():
         sys.exit(1)
 
     mode = sys.argv[1]
+    inject_faults(mode)
 
     if mode == "tunnel_a":
         mock_tunnel_a()
     elif mode == "tunnel_b":
-        time.sleep(2) # simulate delay
         mock_tunnel_b()
-    elif mode == "set_location":
-        # args expected: -- <LAT> <LON>
-        # sys.argv might look like: ['mock_cli.py', 'set_location', '--', '25.0', '121.0']
-        try:
-            # Find '--'
-            if '--' in sys.argv:
-                dash_index = sys.argv.index('--')
-                lat = sys.argv[dash_index+1]
-                lon = sys.argv[dash_index+2]
-            else:
-                # Fallback if no -- provided in mock call (though real app will provide it)
-                lat = "0.0"
-                lon = "0.0"
-            mock_set_location(lat, lon)
-        except Exception as e:
-            print(f"Error parsing args: {e}")
-            mock_set_location("0.0", "0.0")
-
-    elif mode == "play":
-        # args expected: -- <GPX_PATH> <NOISE>
-        try:
-            if '--' in sys.argv:
-                dash_index = sys.argv.index('--')
-                gpx_path = sys.argv[dash_index+1]
-                noise = sys.argv[dash_index+2]
-            else:
-                gpx_path = "unknown.gpx"
-                noise = "500"
-            mock_play(gpx_path, noise)
-        except Exception as e:
-            print(f"Error parsing args: {e}")
-            mock_play("unknown.gpx", "500")
+    elif mode == "location_session":
+        # args expected: --rsd <IP> <PORT>
+        if '--rsd' in sys.argv:
+            rsd_index = sys.argv.index('--rsd')
+            mock_location_session(sys.argv[rsd_index+1], sys.argv[rsd_index+2])
+        else:
+            mock_location_session("::1", "0")
 
     elif mode == "clear_location":
         mock_clear_location()
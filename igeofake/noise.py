@@ -0,0 +1,70 @@
+"""Seedable timing and position noise for route playback.
+
+A NoiseModel turns a route's clean timeline and coordinates into the
+jittered ones in a single vectorized pass before playback starts, so the
+player's loop only indexes arrays. Timing jitter, GPS scatter and speed
+variation each draw from their own stream spawned from one seed: the same
+seed gives bit-for-bit the same playback, and turning one knob does not
+change the draws of the others.
+"""
+from typing import Optional
+
+import numpy as np
+
+JITTER_KINDS = ("uniform", "gaussian")
+METERS_PER_DEGREE = 111_320.0 # latitude degree; longitude scales with cos(lat)
+SPEED_SMOOTHING = 15 # points; speed variation drifts over this window instead of flickering per point
+MIN_SPEED_FACTOR = 0.2
+
+
+class NoiseModel:
+    def __init__(self, seed: Optional[int] = None, jitter_ms: float = 0.0, jitter: str = "uniform",
+                 scatter_m: float = 0.0, speed_variation: float = 0.0):
+        """jitter_ms: half-width (uniform) or standard deviation (gaussian) of per-point timing noise.
+        scatter_m: standard deviation of GPS position scatter in meters.
+        speed_variation: standard deviation of the relative speed factor (0.1 = +-10 %).
+        """
+        if jitter not in JITTER_KINDS:
+            raise ValueError(f"unknown jitter kind {jitter!r}, expected one of {', '.join(JITTER_KINDS)}")
+        # Without a seed pick one, so that any run can still be replayed exactly
+        self.seed = int(seed) if seed is not None else int(np.random.SeedSequence().entropy % 2 ** 63)
+        self.jitter_ms = float(jitter_ms)
+        self.jitter = jitter
+        self.scatter_m = float(scatter_m)
+        self.speed_variation = float(speed_variation)
+
+    def __repr__(self) -> str:
+        return (f"seed {self.seed}, {self.jitter} jitter {self.jitter_ms:g} ms, "
+                f"scatter {self.scatter_m:g} m, speed variation {self.speed_variation:g}")
+
+    def apply(self, times: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns (times, lat, lon) with noise applied; times stay non-decreasing."""
+        n = len(times)
+        timing_rng, scatter_rng, speed_rng = (np.random.default_rng(s) for s in np.random.SeedSequence(self.seed).spawn(3))
+        times = np.asarray(times, dtype=float)
+
+        if self.speed_variation and n > 1:
+            # Smoothed Gaussian noise: the pace wanders rather than changing at every point
+            raw = speed_rng.standard_normal(n - 1 + SPEED_SMOOTHING - 1)
+            kernel = np.full(SPEED_SMOOTHING, 1.0 / np.sqrt(SPEED_SMOOTHING))
+            factors = np.maximum(1.0 + self.speed_variation * np.convolve(raw, kernel, mode='valid'), MIN_SPEED_FACTOR)
+            out = np.zeros(n)
+            np.cumsum(np.diff(times) / factors, out=out[1:])
+            times = out
+
+        if self.jitter_ms:
+            width = self.jitter_ms / 1000.0
+            if self.jitter == "gaussian":
+                offsets = timing_rng.normal(0.0, width, n)
+            else:
+                offsets = timing_rng.uniform(-width, width, n)
+            # The first point still starts the route; no point may overtake the one before it
+            offsets[0] = 0.0
+            times = np.maximum.accumulate(np.maximum(times + offsets, 0.0))
+
+        if self.scatter_m:
+            north, east = scatter_rng.normal(0.0, self.scatter_m, (2, n))
+            lat = lat + north / METERS_PER_DEGREE
+            lon = lon + east / (METERS_PER_DEGREE * np.cos(np.radians(lat)))
+
+        return times, lat, lon
@@ -0,0 +1,125 @@
+"""Zoom-tiered, encoded-polyline route overlays for the Leaflet map.
+
+A route is decimated once into a few level-of-detail tiers, each
+simplified to about half a screen pixel at its zoom level. A client asks
+for the tier matching its zoom and gets Google encoded-polyline strings
+(a few bytes per point) instead of raw coordinates; tiers that are still
+large at close zoom are clipped to the visible bounds.
+"""
+import math
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from preprocess import simplify_mask
+from route import Route
+
+TIER_ZOOMS = (5, 8, 11, 13, 15, 17) # each tier serves this zoom and the ones below the previous tier
+TOLERANCE_PX = 0.5 # simplification tolerance in screen pixels
+METERS_PER_PIXEL_Z0 = 156_543.03 # Web Mercator ground resolution at zoom 0, on the equator
+CLIP_MIN_POINTS = 5000 # tiers up to this size are sent whole, so the client can cache them across pans
+CLIP_MARGIN = 0.25 # fraction of the view added on every side before clipping
+CACHE_ROUTES = 16 # routes whose tiers are kept in memory
+
+
+def encode(lat: np.ndarray, lon: np.ndarray, precision: int = 5) -> str:
+    """Google encoded-polyline string, built with array operations rather than a per-point loop."""
+    if not len(lat):
+        return ""
+    scale = 10 ** precision
+    coords = np.empty(2 * len(lat), dtype=np.int64)
+    coords[0::2] = np.round(np.asarray(lat) * scale)
+    coords[1::2] = np.round(np.asarray(lon) * scale)
+    deltas = np.empty_like(coords)
+    deltas[:2] = coords[:2]
+    deltas[2:] = coords[2:] - coords[:-2]
+    values = (deltas << 1) ^ (deltas >> 63) # zigzag: small magnitudes of either sign stay small
+
+    # Split every value into 5-bit chunks, low bits first; all but the last get the 0x20 flag
+    width = max(1, math.ceil(int(values.max()).bit_length() / 5))
+    shifted = values[:, None] >> (5 * np.arange(width))
+    chunks = shifted & 0x1F
+    count = np.maximum(1, (shifted > 0).sum(axis=1))
+    used = np.arange(width) < count[:, None]
+    more = np.arange(width) < (count - 1)[:, None]
+    chars = (chunks | (more * 0x20)) + 63
+    return chars[used].astype(np.uint8).tobytes().decode('ascii')
+
+
+def meters_per_pixel(zoom: int, lat: float) -> float:
+    return METERS_PER_PIXEL_Z0 * math.cos(math.radians(lat)) / 2 ** zoom
+
+
+def tier_for(zoom: float) -> int:
+    """The coarsest tier detailed enough for a zoom level."""
+    for tier in TIER_ZOOMS:
+        if zoom <= tier:
+            return tier
+    return TIER_ZOOMS[-1]
+
+
+class RouteTiers:
+    """The level-of-detail tiers of one route, finest first computed from the full track."""
+
+    def __init__(self, route: Route):
+        lat, lon = np.frombuffer(route.lat), np.frombuffer(route.lon)
+        mid_lat = float((lat.min() + lat.max()) / 2) if len(lat) else 0.0
+        self.points = len(lat)
+        self.bounds = (float(lat.min()), float(lon.min()), float(lat.max()), float(lon.max())) if len(lat) else None
+        self.tiers: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        if not len(lat):
+            # A GPX without track points: empty tiers, nothing to simplify
+            self.tiers = {zoom: (lat, lon) for zoom in TIER_ZOOMS}
+            return
+        # Each coarser tier only needs to look at the points the finer one kept
+        for zoom in reversed(TIER_ZOOMS):
+            keep = simplify_mask(lat, lon, TOLERANCE_PX * meters_per_pixel(zoom, mid_lat))
+            lat, lon = lat[keep], lon[keep]
+            self.tiers[zoom] = (lat, lon)
+
+    def polylines(self, zoom: float, bbox: Optional[tuple[float, float, float, float]] = None) -> dict:
+        """Encoded polylines of the tier for zoom; bbox (south, west, north, east) clips large tiers."""
+        tier = tier_for(zoom)
+        lat, lon = self.tiers[tier]
+        clipped = bbox is not None and len(lat) > CLIP_MIN_POINTS
+        if not clipped:
+            runs = [(lat, lon)]
+        else:
+            south, west, north, east = bbox
+            pad_lat, pad_lon = (north - south) * CLIP_MARGIN, (east - west) * CLIP_MARGIN
+            inside = ((lat >= south - pad_lat) & (lat <= north + pad_lat) &
+                      (lon >= west - pad_lon) & (lon <= east + pad_lon))
+            # Keep one neighbour on each side so lines still cross the view edge
+            inside[1:] |= inside[:-1].copy()
+            inside[:-1] |= inside[1:].copy()
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], inside.astype(np.int8), [0]))))
+            runs = [(lat[a:b], lon[a:b]) for a, b in zip(edges[0::2], edges[1::2])]
+        return {
+            "tier": tier,
+            "tiers": list(TIER_ZOOMS),
+            "clipped": clipped,
+            "points": sum(len(run[0]) for run in runs),
+            "bounds": self.bounds,
+            "polylines": [encode(*run) for run in runs if len(run[0])],
+        }
+
+
+class TierCache:
+    """A few routes' tiers, least recently used dropped first."""
+
+    def __init__(self, size: int = CACHE_ROUTES):
+        self.size = size
+        self._tiers: OrderedDict[str, RouteTiers] = OrderedDict()
+
+    def get(self, key: str) -> Optional[RouteTiers]:
+        tiers = self._tiers.get(key)
+        if tiers is not None:
+            self._tiers.move_to_end(key)
+        return tiers
+
+    def put(self, key: str, tiers: RouteTiers):
+        self._tiers[key] = tiers
+        self._tiers.move_to_end(key)
+        while len(self._tiers) > self.size:
+            self._tiers.popitem(last=False)
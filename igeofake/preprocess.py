@@ -0,0 +1,171 @@
+"""Vectorized route preprocessing.
+
+Every step works on whole point arrays at once (no per-point Python loops):
+haversine distances, timelines, Douglas-Peucker simplification and
+resampling to a fixed time step or a target speed. RouteCache.load runs
+preprocess() on every route it loads for playback, and RoutePlayer takes
+its distances and timeline from here.
+"""
+from typing import Optional
+
+import numpy as np
+
+from route import Route
+
+EARTH_RADIUS_M = 6371008.8
+DEFAULT_WALK_SPEED = 1.4 # m/s, used for GPX files without timestamps
+
+
+def columns(route: Route) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Zero-copy float64 views of a Route's lat/lon/ele/time arrays."""
+    return tuple(np.frombuffer(col, dtype=np.float64) for col in (route.lat, route.lon, route.ele, route.time))
+
+
+def from_columns(lat, lon, ele=None, t=None) -> Route:
+    route = Route()
+    n = len(lat)
+    nan = np.full(n, np.nan)
+    for col, values in zip((route.lat, route.lon, route.ele, route.time),
+                           (lat, lon, nan if ele is None else ele, nan if t is None else t)):
+        col.frombytes(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return route
+
+
+def haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in meters, element-wise over arrays of degrees."""
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dl = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def segment_distances(lat, lon) -> np.ndarray:
+    """Length in meters of each of the n-1 segments."""
+    return haversine(lat[:-1], lon[:-1], lat[1:], lon[1:])
+
+
+def cumulative_distance(lat, lon) -> np.ndarray:
+    """Distance in meters from the first point to every point (length n)."""
+    out = np.zeros(len(lat))
+    np.cumsum(segment_distances(lat, lon), out=out[1:])
+    return out
+
+
+def timeline(route: Route, speed: float = DEFAULT_WALK_SPEED) -> np.ndarray:
+    """Seconds from the first point, non-decreasing.
+
+    Uses the GPX timestamps when every point has one, otherwise assumes a
+    constant `speed` (m/s) along the route.
+    """
+    lat, lon, _, t = columns(route)
+    if len(t) and not np.isnan(t).any():
+        return np.maximum.accumulate(t - t[0])
+    return cumulative_distance(lat, lon) / speed
+
+
+def _project(lat, lon) -> tuple[np.ndarray, np.ndarray]:
+    # Local equirectangular projection in meters; accurate enough for
+    # perpendicular distances within a single route
+    lat0 = np.radians(np.mean(lat)) if len(lat) else 0.0
+    x = np.radians(lon) * np.cos(lat0) * EARTH_RADIUS_M
+    y = np.radians(lat) * EARTH_RADIUS_M
+    return x, y
+
+
+def simplify_mask(lat, lon, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker keep-mask for a tolerance in meters.
+
+    Splits all pending segments of one recursion level together: the
+    chord distance of every point in every pending segment is computed in
+    a single vectorized pass, so the Python loop runs once per level
+    (~log n times), not once per segment or point.
+    """
+    n = len(lat)
+    if n <= 2:
+        return np.ones(n, dtype=bool)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+
+    x, y = _project(lat, lon)
+    starts = np.array([0])
+    ends = np.array([n - 1])
+    while len(starts):
+        inner = ends - starts - 1
+        offsets = np.zeros(len(starts), dtype=np.int64)
+        np.cumsum(inner[:-1], out=offsets[1:])
+        seg = np.repeat(np.arange(len(starts)), inner)
+        idx = np.arange(len(seg)) - offsets[seg] + starts[seg] + 1
+
+        # Chord of each segment as a normalized line a*x + b*y + c = 0
+        dx, dy = x[ends] - x[starts], y[ends] - y[starts]
+        chord = np.hypot(dx, dy)
+        closed = chord == 0 # start == end (loops): fall back to point distance
+        chord[closed] = 1.0
+        a, b = -dy / chord, dx / chord
+        c = -(a * x[starts] + b * y[starts])
+        px, py = x[idx], y[idx]
+        dist = np.abs(a[seg] * px + b[seg] * py + c[seg])
+        if closed.any():
+            loop = closed[seg]
+            sx, sy = x[starts][seg[loop]], y[starts][seg[loop]]
+            dist[loop] = np.hypot(px[loop] - sx, py[loop] - sy)
+
+        # First point reaching each segment's maximum distance
+        peak = np.maximum.reduceat(dist, offsets)
+        hits = np.flatnonzero(dist == peak[seg])
+        first = np.flatnonzero(np.diff(seg[hits], prepend=-1))
+        mid = idx[hits[first]]
+
+        split = peak > tolerance
+        mid, s_split, e_split = mid[split], starts[split], ends[split]
+        keep[mid] = True
+
+        # Children with at least one inner point go to the next level
+        starts = np.concatenate((s_split, mid))
+        ends = np.concatenate((mid, e_split))
+        pending = ends - starts > 1
+        starts, ends = starts[pending], ends[pending]
+    return keep
+
+
+def simplify(route: Route, tolerance: float) -> Route:
+    lat, lon, ele, _ = columns(route)
+    t = timeline(route)
+    keep = simplify_mask(lat, lon, tolerance)
+    return from_columns(lat[keep], lon[keep], ele[keep], t[keep])
+
+
+def resample(route: Route, step: float = 1.0, speed: Optional[float] = None) -> Route:
+    """Resamples to one point every `step` seconds.
+
+    With `speed` (m/s) the route is first re-timed to that constant speed,
+    otherwise its own timeline is used.
+    """
+    lat, lon, ele, _ = columns(route)
+    if len(lat) < 2:
+        return from_columns(lat, lon, ele, timeline(route))
+
+    t = cumulative_distance(lat, lon) / speed if speed else timeline(route)
+    # Repeated times (pauses in the recording) are fine for np.interp
+    t_new = np.arange(0.0, t[-1], step)
+    if not len(t_new) or t_new[-1] < t[-1]:
+        t_new = np.append(t_new, t[-1])
+    ele_new = np.interp(t_new, t, ele) if not np.isnan(ele).any() else None
+    return from_columns(np.interp(t_new, t, lat), np.interp(t_new, t, lon), ele_new, t_new)
+
+
+def preprocess(route: Route, tolerance: float = 0.0, step: float = 0.0, speed: float = 0.0) -> Route:
+    """Runs the configured steps in order: re-time/resample, then simplify.
+
+    A zero value skips the corresponding step. The result always carries
+    timestamps so it can be written back to GPX and played as-is.
+    """
+    t0 = route.time[0] if route.has_time else 0.0
+    if step or speed:
+        route = resample(route, step or 1.0, speed or None)
+    if tolerance:
+        route = simplify(route, tolerance)
+    # Back to absolute timestamps, anchored at the original start time
+    lat, lon, ele, _ = columns(route)
+    return from_columns(lat, lon, ele, timeline(route) + t0)
+
@@ -3,10 +3,22 @@ import sys
 import os
 import ctypes
 import re
-import signal
-import subprocess
+import time
 from typing import Callable, Optional
 
+import numpy as np
+
+import metrics
+from journal import Journal, JournalReader, SOURCE_CLEAR, SOURCE_FOLLOW, SOURCE_ROUTE, SOURCE_SET
+from log_pipeline import LogPipeline
+from noise import NoiseModel
+from process_supervisor import ProcessSupervisor
+from preprocess import cumulative_distance, timeline
+from route import Route
+from route_cache import RouteCache
+from route_library import RouteLibrary
+from rsd_discovery import RsdDiscovery
+
 # Constants for State
 STATE_STOPPED = "Stopped"
 STATE_STARTING = "Starting"
@@ -15,30 +27,596 @@ STATE_CONNECTED = "Connected (RSD Found)"
 STATE_SIMULATING = "Simulating..."
 STATE_ERROR = "Error"
 
+# Use the follow connection option: --rsd <IP> <PORT>
+RSD_PATTERN = re.compile(r'--rsd\s+([a-f0-9:]+)\s+(\d+)')
+# Device UDIDs, new (00008150-001E6CE20228401C) and legacy (40 hex) formats
+UDID_PATTERN = re.compile(r'\b([0-9A-Fa-f]{8}-[0-9A-Fa-f]{16}|[0-9A-Fa-f]{40})\b')
+# Registry key for an RSD announced without any UDID on its stream
+DEFAULT_UDID = "default"
+# Longest subprocess output line read in one piece (asyncio's default is 64 KiB)
+STREAM_LIMIT = 1024 * 1024
+
+# Seconds to wait for the location session to come up / acknowledge a command
+SESSION_START_TIMEOUT = 15.0
+SESSION_ACK_TIMEOUT = 5.0
+
+# Fleet broadcast: in-flight session spawns / commands, and per-device deadline
+FLEET_SPAWN_CONCURRENCY = 8
+FLEET_WRITE_CONCURRENCY = 64
+FLEET_TIMEOUT = 10.0
+
+# One-click connect: overall deadline, and how long tunneld may list no device before Tunnel B is tried
+CONNECT_TIMEOUT = 30.0
+CONNECT_TUNNEL_B_AFTER = 3.0
+
+# Tunnel supervision: restart backoff, deadline for devices to reappear, RSD health probes
+RECONNECT_BACKOFF_INITIAL = 1.0
+RECONNECT_BACKOFF_MAX = 60.0
+RECONNECT_READY_TIMEOUT = 30.0
+RECONNECT_STABLE_AFTER = 60.0 # a restart that lasts this long resets the backoff
+HEALTH_INTERVAL = 5.0
+HEALTH_PROBE_TIMEOUT = 2.0
+HEALTH_FAILURES = 3 # consecutive failed probes before the RSD counts as stale
+
+# Route playback
+MIN_ROUTE_SPEED = 0.1
+MAX_ROUTE_SPEED = 50.0
+
+class RoutePlayer:
+    """Plays a route through a location channel on a monotonic clock.
+
+    Every point has an absolute due time on the route timeline; wall-clock
+    targets are derived from an anchor (route time, monotonic time) pair, so
+    sleeps never accumulate drift. Points that are already overdue (slow
+    channel, high speed factor) are skipped in favour of the latest due one.
+    """
+
+    def __init__(self, route: Route, send: Callable, noise: Optional[NoiseModel] = None,
+                 on_position: Optional[Callable[[dict], None]] = None,
+                 on_finish: Optional[Callable[[], None]] = None,
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        if not len(route):
+            raise ValueError("route has no points")
+        lat, lon = np.frombuffer(route.lat), np.frombuffer(route.lon)
+        self.dists = cumulative_distance(lat, lon)
+        self.times = timeline(route)
+
+        # Timing jitter, scatter and speed variation are all drawn here, once
+        self.noise = noise
+        if noise is not None:
+            self.times, lat, lon = noise.apply(self.times, lat, lon)
+        self.lats = lat.tolist()
+        self.lons = lon.tolist()
+
+        self.send = send
+        self.on_position = on_position
+        self.on_finish = on_finish
+        self.on_error = on_error
+
+        self.speed = 1.0
+        self.paused = False
+        self.index = 0 # next point to send
+        self.current = 0 # last point sent (or sought to)
+        self._anchor_route = 0.0
+        self._anchor_wall = 0.0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def duration(self) -> float:
+        return float(self.times[-1])
+
+    @property
+    def length(self) -> float:
+        return float(self.dists[-1])
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def route_time(self) -> float:
+        if self.paused:
+            return self._anchor_route
+        return self._anchor_route + (time.monotonic() - self._anchor_wall) * self.speed
+
+    def position(self) -> dict:
+        i = self.current
+        return {
+            "lat": self.lats[i],
+            "lon": self.lons[i],
+            "index": i,
+            "points": len(self.lats),
+            "elapsed": min(self.route_time(), self.duration),
+            "duration": self.duration,
+            "distance": float(self.dists[i]),
+            "length": self.length,
+            "speed": self.speed,
+            "paused": self.paused,
+            "finished": self.index >= len(self.lats),
+        }
+
+    def _reanchor(self, route_t: float):
+        self._anchor_route = route_t
+        self._anchor_wall = time.monotonic()
+        self._wake.set()
+
+    def start(self):
+        self._reanchor(0.0)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def pause(self):
+        if not self.paused:
+            self._reanchor(self.route_time())
+            self.paused = True
+
+    def resume(self):
+        if self.paused:
+            self.paused = False
+            self._reanchor(self._anchor_route)
+
+    def set_speed(self, speed: float):
+        current = self.route_time()
+        self.speed = min(max(speed, MIN_ROUTE_SPEED), MAX_ROUTE_SPEED)
+        self._reanchor(current)
+
+    def seek(self, distance: Optional[float] = None, seconds: Optional[float] = None):
+        """Jumps to a distance (m) or route time (s) from the start."""
+        if distance is not None:
+            self.index = min(int(np.searchsorted(self.dists, distance)), len(self.dists) - 1)
+        elif seconds is not None:
+            self.index = min(int(np.searchsorted(self.times, seconds)), len(self.times) - 1)
+        else:
+            return
+        self.current = self.index
+        self._reanchor(float(self.times[self.index]))
+        # Seeking back into a finished route starts it again
+        if self._task is not None and self._task.done() and not self._task.cancelled():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        n = len(self.lats)
+        while self.index < n:
+            self._wake.clear()
+            if self.paused:
+                await self._wake.wait()
+                continue
+
+            due = float(self.times[self.index])
+            delay = (due - self.route_time()) / self.speed
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                    continue # pause/seek/speed changed, re-evaluate
+                except asyncio.TimeoutError:
+                    pass
+
+            # Drift correction: jump to the most recent point that is already due
+            now = self.route_time()
+            i = self.index
+            while i + 1 < n and self.times[i + 1] <= now:
+                i += 1
+
+            try:
+                await self.send(self.lats[i], self.lons[i])
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+                return
+            self.current = i
+            self.index = i + 1
+            if self.on_position:
+                self.on_position(self.position())
+
+        if self.on_finish:
+            self.on_finish()
+
+
+class Device:
+    """One iOS device: its RSD endpoint, location session, route player and state.
+
+    Every device has its own session process and locks, so operations on
+    different devices run concurrently and never wait on each other.
+    """
+
+    def __init__(self, manager: "ProcessManager", udid: str):
+        self.manager = manager
+        self.udid = udid
+        self.name = udid[-8:]
+
+        self.rsd_ip: Optional[str] = None
+        self.rsd_port: Optional[str] = None
+        self.state = STATE_CONNECTED
+        self.state_since = time.monotonic()
+
+        self.player: Optional[RoutePlayer] = None
+        # Persistent location session (one DVT channel, many coordinate updates)
+        self.proc_session: Optional[asyncio.subprocess.Process] = None
+        self.session_rsd: Optional[tuple[str, str]] = None
+        self._session_acks: asyncio.Queue = asyncio.Queue()
+        self._session_lock = asyncio.Lock()
+
+        # Follow mode: only the newest dragged coordinate waits while one is in flight
+        self._follow_target: Optional[tuple[str, str]] = None
+        self._follow_task: Optional[asyncio.Task] = None
+
+        # What the device should be doing, re-applied after a tunnel restart
+        self.last_location: Optional[tuple[str, str]] = None
+        self.last_route: Optional[dict] = None
+        self.health_failures = 0
+
+    def log(self, message: str):
+        self.manager.log(f"[{self.name}] {message}")
+
+    def set_state(self, new_state: str):
+        if new_state != self.state:
+            now = time.monotonic()
+            metrics.STATE_TRANSITIONS.inc(scope="device", to=new_state)
+            if self.state == STATE_SIMULATING:
+                metrics.SIMULATION_SECONDS.observe(now - self.state_since)
+            self.state_since = now
+        self.state = new_state
+        self.manager.on_device_state(self)
+
+    def info(self) -> dict:
+        return {
+            "udid": self.udid,
+            "rsd": f"{self.rsd_ip} {self.rsd_port}" if self.rsd_ip else None,
+            "state": self.state,
+            "route": self.player.position() if self.player else None,
+        }
+
+    async def _start_session(self):
+        """Spawns the location session for the current RSD endpoint and waits for READY."""
+        rsd = (self.rsd_ip, self.rsd_port)
+        if self.proc_session and self.proc_session.returncode is None and self.session_rsd == rsd:
+            return
+
+        # Endpoint changed (or session died): replace it
+        if self.proc_session:
+            old_proc = self.proc_session
+            self.proc_session = None
+            self.session_rsd = None
+            await self.manager.processes.kill(old_proc)
+
+        cmd_s = self.manager._get_command("location_session", self.rsd_ip, self.rsd_port)
+        self.log(f"Starting Location Session: {' '.join(cmd_s)}")
+
+        env = os.environ.copy()
+        env["PYTHONUNBUFFERED"] = "1"
+
+        # Spawn until READY covers the RSD connect and the DVT handshake
+        async with metrics.span("session_start"):
+            self._session_acks = asyncio.Queue()
+            proc = await self.manager.processes.spawn("location_session", cmd_s, env=env,
+                                                      stdin=True, limit=STREAM_LIMIT)
+            self.proc_session = proc
+            self.session_rsd = rsd
+            self.manager.processes.track(
+                proc,
+                self.manager._read_stream(proc.stdout, f"Session {self.name}", ack_queue=self._session_acks),
+                self._watch_session(proc))
+
+            try:
+                ready = await asyncio.wait_for(self._session_acks.get(), timeout=SESSION_START_TIMEOUT)
+            except asyncio.TimeoutError:
+                ready = None
+            if ready != "READY":
+                self.proc_session = None
+                self.session_rsd = None
+                await self.manager.processes.kill(proc)
+                raise RuntimeError("location session did not become ready")
+
+    async def prewarm(self):
+        """Starts the location session ahead of the first command."""
+        async with self._session_lock:
+            await self._start_session()
+
+    async def _watch_session(self, proc):
+        await proc.wait()
+        if self.proc_session != proc:
+            return # replaced or stopped on purpose
+
+        # A dead session is respawned on the next update, so don't go to Error
+        self.proc_session = None
+        self.session_rsd = None
+        self.log(f"WARNING: Location session exited with code {proc.returncode}")
+        await self._stop_player()
+        if self.state == STATE_SIMULATING:
+            self.set_state(STATE_CONNECTED)
+
+    async def _session_command(self, command: str):
+        """Sends one command over the persistent session and waits for its acknowledgement."""
+        async with self._session_lock:
+            await self._start_session()
+            async with metrics.span("session_command"):
+                proc = self.proc_session
+                proc.stdin.write(f"{command}\n".encode())
+                await proc.stdin.drain()
+                try:
+                    reply = await asyncio.wait_for(self._session_acks.get(), timeout=SESSION_ACK_TIMEOUT)
+                except asyncio.TimeoutError:
+                    # A late reply would desync the protocol; start over with a fresh session
+                    await self._stop_session()
+                    raise RuntimeError(f"no reply to '{command}' from location session")
+                if not reply.startswith("OK "):
+                    raise RuntimeError(reply)
+
+    async def _send_location(self, source: int, lat=None, lon=None):
+        """Sends a location (a clear without coordinates) over the session, journaling it first."""
+        journal = self.manager.journal
+        if lat is None:
+            if journal:
+                journal.record(self.udid, SOURCE_CLEAR)
+            await self._session_command("clear")
+        else:
+            if journal:
+                journal.record(self.udid, source, float(lat), float(lon))
+            await self._session_command(f"set {lat} {lon}")
+
+    async def _stop_session(self):
+        if not self.proc_session:
+            return
+        proc = self.proc_session
+        self.proc_session = None # Detach first so _watch_session ignores it
+        self.session_rsd = None
+        try:
+            proc.stdin.write(b"quit\n")
+            await proc.stdin.drain()
+            await asyncio.wait_for(proc.wait(), timeout=1.0)
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        await self.manager.processes.kill(proc)
+
+    async def _stop_player(self):
+        if self.player:
+            player = self.player
+            self.player = None
+            await player.stop()
+            if self.last_route is not None:
+                # Remember where playback got to, in case it has to be resumed
+                self.last_route.update(seconds=float(player.times[player.current]),
+                                       speed=player.speed, paused=player.paused)
+
+    @metrics.timed("set_location")
+    async def set_location(self, lat: str, lon: str) -> bool:
+        self._follow_target = None
+        # A running route owns the location; stop it before teleporting
+        if self.player:
+            self.log("Stopping route playback...")
+            await self._stop_player()
+
+        try:
+            self.log(f"Setting Location: {lat}, {lon}")
+            await self._send_location(SOURCE_SET, lat, lon)
+            self.last_location = (lat, lon)
+            self.last_route = None
+            self.set_state(STATE_SIMULATING)
+            return True
+
+        except Exception as e:
+            self.log(f"ERROR setting location: {e}")
+            return False
+
+    @metrics.timed("play_route")
+    async def play_route(self, gpx_path: str, noise: str, tolerance: float = 0.0,
+                         step: float = 0.0, target_speed: float = 0.0,
+                         noise_model: Optional[NoiseModel] = None, route: Optional[Route] = None,
+                         speed: float = 1.0) -> bool:
+        """Plays a GPX route; noise_model overrides the plain noise (ms of uniform timing jitter).
+
+        route, when given, is the already loaded and preprocessed track (a fleet shares one).
+        """
+        if self.player:
+            self.log("Stopping previous route playback...")
+            await self._stop_player()
+
+        try:
+            if route is None:
+                started = time.monotonic()
+                route, hit = await asyncio.to_thread(self.manager.route_cache.load, gpx_path, tolerance, step, target_speed)
+                self.log(f"Route {'loaded from cache' if hit else 'parsed'} in "
+                         f"{(time.monotonic() - started) * 1000:.0f} ms ({len(route)} points)")
+
+            async def send(lat, lon):
+                await self._send_location(SOURCE_ROUTE, lat, lon)
+
+            if noise_model is None:
+                noise_model = NoiseModel(jitter_ms=int(noise))
+            player = RoutePlayer(route, send, noise=noise_model,
+                                 on_position=lambda position: self.manager.on_device_position(self, position),
+                                 on_finish=self._on_route_finished,
+                                 on_error=lambda e: self.log(f"ERROR during route playback: {e}"))
+            self.log(f"Playing Route: {gpx_path} ({len(route)} points, "
+                     f"{player.length:.0f} m, {player.duration:.0f} s, noise: {noise_model})")
+
+            await self.prewarm() # under the session lock, like every other session start
+            self.player = player
+            player.start()
+            player.set_speed(speed)
+            # The model keeps its seed, so a resumed route replays the same timeline
+            self.last_route = {"gpx_path": gpx_path, "noise": noise, "tolerance": tolerance,
+                               "step": step, "target_speed": target_speed, "noise_model": noise_model}
+            self.set_state(STATE_SIMULATING)
+            return True
+
+        except Exception as e:
+            self.log(f"ERROR playing route: {e}")
+            return False
+
+    def _on_route_finished(self):
+        self.log("Route finished.")
+        self.last_route = None
+
+    @metrics.timed("clear_location")
+    async def clear_location(self) -> bool:
+        self._follow_target = None
+        self.last_location = None
+        self.last_route = None
+        # Stop any route playback first
+        await self._stop_player()
+
+        if self.state == STATE_SIMULATING:
+            self.set_state(STATE_CONNECTED)
+
+        try:
+            self.log("Clearing Location via session")
+            await self._send_location(SOURCE_CLEAR)
+            self.log("Location cleared.")
+            return True
+        except Exception as e:
+            self.log(f"ERROR clearing location: {e}")
+            return False
+
+    def follow_location(self, lat: str, lon: str):
+        """Moves the device towards a marker being dragged, without queueing.
+
+        Returns immediately. While one update is in flight, later ones
+        overwrite each other and only the newest is sent when it completes.
+        """
+        if self._follow_target is not None:
+            metrics.FOLLOW_COALESCED.inc()
+        self._follow_target = (lat, lon)
+        if self._follow_task is None or self._follow_task.done():
+            self._follow_task = asyncio.create_task(self._follow())
+
+    async def _follow(self):
+        if self.player:
+            self.log("Stopping route playback to follow the marker...")
+            await self._stop_player()
+
+        while self._follow_target is not None:
+            lat, lon = self._follow_target
+            self._follow_target = None
+            try:
+                await self._send_location(SOURCE_FOLLOW, lat, lon)
+            except Exception as e:
+                self._follow_target = None
+                self.log(f"ERROR following marker: {e}")
+                return
+            self.last_location = (lat, lon)
+            self.last_route = None
+            if self.state != STATE_SIMULATING:
+                self.set_state(STATE_SIMULATING)
+
+    async def replay_record(self, source: int, lat: float, lon: float):
+        """Sends one journal record again, under its original source."""
+        self._follow_target = None
+        if self.player:
+            await self._stop_player()
+        if source == SOURCE_CLEAR:
+            self.last_location = None
+            await self._send_location(SOURCE_CLEAR)
+            if self.state == STATE_SIMULATING:
+                self.set_state(STATE_CONNECTED)
+            return
+        await self._send_location(source, lat, lon)
+        self.last_location = (str(lat), str(lon))
+        self.last_route = None
+        if self.state != STATE_SIMULATING:
+            self.set_state(STATE_SIMULATING)
+
+    async def resume(self) -> bool:
+        """Re-applies the last location, or restarts the last route where it left off."""
+        route = self.last_route
+        if route is not None:
+            self.log(f"Resuming route at {route.get('seconds', 0.0):.0f} s")
+            if not await self.play_route(route["gpx_path"], route["noise"], route["tolerance"],
+                                         route["step"], route["target_speed"], route["noise_model"],
+                                         speed=route.get("speed", 1.0)):
+                return False
+            self.player.seek(seconds=route.get("seconds", 0.0))
+            if route.get("paused"):
+                self.player.pause()
+            return True
+        if self.last_location is not None:
+            self.log("Restoring last location")
+            return await self.set_location(*self.last_location)
+        return True
+
+    async def probe(self) -> bool:
+        """Checks that the RSD endpoint still accepts connections."""
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(self.rsd_ip, int(self.rsd_port)),
+                                               timeout=HEALTH_PROBE_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        return True
+
+    async def stop(self):
+        self._follow_target = None
+        await self._stop_player()
+        await self._stop_session()
+
+
 class ProcessManager:
-    def __init__(self, log_callback: Callable[[str], None], status_callback: Callable[[str], None]):
+    def __init__(self, log_callback: Callable[[str], None], status_callback: Callable[[str], None],
+                 position_callback: Optional[Callable[[dict], None]] = None,
+                 devices_callback: Optional[Callable[[list[str]], None]] = None):
         self.log_callback = log_callback
+        # Batches log lines to log_callback; IGEOFAKE_LOG_FILE enables a rotating file copy
+        self.logs = LogPipeline(log_callback, log_file=os.environ.get('IGEOFAKE_LOG_FILE'))
         self.status_callback = status_callback
+        self.position_callback = position_callback
+        self.devices_callback = devices_callback
 
+        # Every child process is spawned, tracked and killed through here
+        self.processes = ProcessSupervisor(self.log)
         self.proc_tunnel_a: Optional[asyncio.subprocess.Process] = None
         self.proc_tunnel_b: Optional[asyncio.subprocess.Process] = None
-        self.proc_sim: Optional[asyncio.subprocess.Process] = None
+        self.route_cache = RouteCache()
+        self.route_library = RouteLibrary()
+        # IGEOFAKE_JOURNAL records every location sent to a device (see journal.py)
+        self.journal: Optional[Journal] = None
+        if os.environ.get('IGEOFAKE_JOURNAL'):
+            try:
+                self.journal = Journal(os.environ['IGEOFAKE_JOURNAL'])
+            except (OSError, ValueError) as e:
+                self.log(f"ERROR opening location journal: {e}")
+        # tunneld's HTTP API is the source of RSD endpoints once Tunnel A is up
+        self.discovery = RsdDiscovery(self._register_rsd, self._on_rsd_removed, log=self.log)
 
-        self.rsd_ip: Optional[str] = None
-        self.rsd_port: Optional[str] = None
+        # Device registry, keyed by UDID; the UI and the udid-less API act on `selected`
+        self.devices: dict[str, Device] = {}
+        self.selected: Optional[str] = None
 
         self.state = STATE_STOPPED
+        self.state_since = time.monotonic()
         self.is_mock = False
 
+        # Supervision: restart dead tunnels and put the devices back where they were
+        self.auto_reconnect = True
+        self.supervising = False # set while services are meant to be up
+        self.tunnel_b_used = False
+        self._recovery_task: Optional[asyncio.Task] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._rsd_changed = asyncio.Event()
+        self._reconnect_delay = RECONNECT_BACKOFF_INITIAL
+        self._recovered_at = float('-inf')
+
         # Determine execution mode
         if sys.platform != 'win32' or os.environ.get('IGEOFAKE_MOCK') == '1':
             self.is_mock = True
             self.log("INFO: Running in MOCK MODE")
 
     def log(self, message: str):
-        self.log_callback(message)
+        self.logs.push("app", message)
 
     def set_state(self, new_state: str):
+        if new_state != self.state:
+            now = time.monotonic()
+            metrics.STATE_TRANSITIONS.inc(scope="host", to=new_state)
+            metrics.STATE_SECONDS.observe(now - self.state_since, state=self.state)
+            self.state_since = now
         self.state = new_state
         self.status_callback(new_state)
 
@@ -50,29 +628,121 @@ class ProcessManager:
         except:
             return False
 
-    async def _read_stream(self, stream, process_name, rsd_parser=False):
+    # Selected-device views, kept for single-device callers
+    @property
+    def device(self) -> Optional[Device]:
+        return self.devices.get(self.selected) if self.selected else None
+
+    @property
+    def player(self) -> Optional[RoutePlayer]:
+        return self.device.player if self.device else None
+
+    @property
+    def rsd_ip(self) -> Optional[str]:
+        return self.device.rsd_ip if self.device else None
+
+    @property
+    def rsd_port(self) -> Optional[str]:
+        return self.device.rsd_port if self.device else None
+
+    def select_device(self, udid: str):
+        if udid not in self.devices:
+            self.log(f"ERROR: Unknown device {udid}")
+            return
+        self.selected = udid
+        if self.devices_callback:
+            self.devices_callback(list(self.devices))
+        self.set_state(self.devices[udid].state)
+
+    def on_device_state(self, device: Device):
+        if device.udid == self.selected:
+            self.set_state(device.state)
+
+    def on_device_position(self, device: Device, position: dict):
+        if self.position_callback and device.udid == self.selected:
+            self.position_callback(position)
+
+    def _register_rsd(self, udid: str, rsd_ip: str, rsd_port: str):
+        device = self.devices.get(udid)
+        if device is None:
+            device = self.devices[udid] = Device(self, udid)
+            self.log(f"Device attached: {udid}")
+            # Select before notifying, so the views see the selection along with the device
+            if self.selected is None:
+                self.selected = udid
+            if self.devices_callback:
+                self.devices_callback(list(self.devices))
+
+        if rsd_ip != device.rsd_ip or rsd_port != device.rsd_port:
+            device.rsd_ip = rsd_ip
+            device.rsd_port = rsd_port
+            device.health_failures = 0
+            metrics.RSD_UPDATES.inc()
+            self._rsd_changed.set()
+            device.log(f"SUCCESS: RSD Updated - IP: {rsd_ip}, Port: {rsd_port}")
+
+        if udid == self.selected and self.state != STATE_SIMULATING:
+            self.set_state(device.state)
+
+    def _on_rsd_removed(self, udid: str):
+        device = self.devices.get(udid)
+        if device and device.rsd_ip:
+            device.log("WARNING: tunneld no longer lists this device")
+            device.rsd_ip = None
+            device.rsd_port = None
+
+    def _resolve(self, udid: Optional[str]) -> Optional[Device]:
+        device = self.devices.get(udid) if udid else self.device
+        if device is None or not device.rsd_ip:
+            self.log("ERROR: RSD Connection info not found yet." if udid is None
+                     else f"ERROR: Device {udid} is not connected.")
+            return None
+        return device
+
+    async def _read_stream(self, stream, process_name, rsd_parser=False, ack_queue=None):
         """Reads stdout/stderr from a subprocess and logs it."""
+        udid = None # last UDID seen on this stream (start-tunnel prints it before the RSD)
         while True:
-            line_bytes = await stream.readline()
+            try:
+                line_bytes = await stream.readuntil(b'\n')
+            except asyncio.IncompleteReadError as e:
+                line_bytes = e.partial # EOF
+            except asyncio.LimitOverrunError:
+                await self._discard_line(stream)
+                self.logs.push(process_name, f"[{process_name}] WARNING: skipped a line over {STREAM_LIMIT} bytes")
+                continue
             if not line_bytes:
                 break
             line = line_bytes.decode('utf-8', errors='replace').strip()
             if line:
-                self.log(f"[{process_name}] {line}")
+                if ack_queue is not None and (line == "READY" or line.startswith(("OK ", "ERR "))):
+                    # Session protocol replies; only errors are worth logging
+                    if line.startswith("ERR "):
+                        self.logs.push(process_name, f"[{process_name}] {line}")
+                    ack_queue.put_nowait(line)
+                    continue
+
+                self.logs.push(process_name, f"[{process_name}] {line}")
 
                 if rsd_parser:
-                    # Regex: Use the follow connection option: --rsd ([a-f0-9:]+) (\d+)
-                    match = re.search(r'--rsd\s+([a-f0-9:]+)\s+(\d+)', line)
+                    udid_match = UDID_PATTERN.search(line)
+                    if udid_match:
+                        udid = udid_match.group(1)
+                    match = RSD_PATTERN.search(line)
                     if match:
-                        new_ip = match.group(1)
-                        new_port = match.group(2)
-                        
-                        if new_ip != self.rsd_ip or new_port != self.rsd_port:
-                            self.rsd_ip = new_ip
-                            self.rsd_port = new_port
-                            self.log(f"SUCCESS: RSD Updated - IP: {self.rsd_ip}, Port: {self.rsd_port}")
-                            if self.state != STATE_SIMULATING:
-                                self.set_state(STATE_CONNECTED)
+                        self._register_rsd(udid or DEFAULT_UDID, match.group(1), match.group(2))
+
+    @staticmethod
+    async def _discard_line(stream):
+        """Drops the rest of an over-long line without buffering it."""
+        while True:
+            try:
+                await stream.readuntil(b'\n')
+                return
+            except asyncio.LimitOverrunError as e:
+                await stream.readexactly(e.consumed)
+            except asyncio.IncompleteReadError:
+                return
 
     async def _wait_for_exit(self, proc, name):
         """Waits for process exit and handles errors."""
@@ -84,29 +754,132 @@ class ProcessManager:
             is_active = True
         elif name == "Tunnel B" and self.proc_tunnel_b == proc:
             is_active = True
-        elif name == "Simulate" and self.proc_sim == proc:
-            is_active = True
 
         # If not active (replaced or set to None), we assume it was intentionally killed
         if not is_active:
             return
 
+        if self.supervising and self.auto_reconnect:
+            self.log(f"ERROR: {name} exited unexpectedly with code {proc.returncode}")
+            self._schedule_recovery(f"{name} exited", "exit")
+            return
+
         if proc.returncode != 0 and proc.returncode is not None:
              if self.state not in [STATE_STOPPED, STATE_ERROR]:
                  self.log(f"ERROR: {name} exited unexpectedly with code {proc.returncode}")
                  self.set_state(STATE_ERROR)
 
+    def _schedule_recovery(self, reason: str, kind: str):
+        if self._recovery_task and not self._recovery_task.done():
+            return # already restarting; its own checks will see this failure
+        metrics.TUNNEL_RECOVERIES.inc(reason=kind)
+        self._recovery_task = asyncio.create_task(self._recover(reason))
+
+    async def _restart_tunnels(self) -> bool:
+        """Tears the tunnels down and brings them back; True once every known device has an RSD again."""
+        tasks = [device.stop() for device in self.devices.values()]
+        for proc in (self.proc_tunnel_b, self.proc_tunnel_a):
+            if proc:
+                tasks.append(self.processes.kill(proc))
+        self.proc_tunnel_b = None
+        self.proc_tunnel_a = None
+        await asyncio.gather(*tasks)
+
+        # Endpoints die with the tunnel; devices keep their last location/route
+        self.discovery.forget()
+        for device in self.devices.values():
+            device.rsd_ip = None
+            device.rsd_port = None
+        self.set_state(STATE_STOPPED)
+
+        await self.start_tunnel_a()
+        if self.state != STATE_TUNNEL_A_RUNNING and self.state != STATE_CONNECTED:
+            return False
+        if self.tunnel_b_used and not all(d.rsd_ip for d in self.devices.values()):
+            await self.start_tunnel_b()
+
+        deadline = time.monotonic() + RECONNECT_READY_TIMEOUT
+        while not self.devices or not all(d.rsd_ip for d in self.devices.values()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._rsd_changed.clear()
+            try:
+                await asyncio.wait_for(self._rsd_changed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def _recover(self, reason: str):
+        if time.monotonic() - self._recovered_at > RECONNECT_STABLE_AFTER:
+            self._reconnect_delay = RECONNECT_BACKOFF_INITIAL
+        else:
+            # Flapping: the last restart "worked" but didn't last, so back off anyway
+            self.log(f"Supervisor: {reason} soon after the last restart; waiting {self._reconnect_delay:g} s")
+            await asyncio.sleep(self._reconnect_delay)
+            self._reconnect_delay = min(self._reconnect_delay * 2, RECONNECT_BACKOFF_MAX)
+
+        attempt = 0
+        while self.supervising:
+            attempt += 1
+            self.log(f"Supervisor: {reason}; restarting tunnels (attempt {attempt})...")
+            started = time.monotonic()
+            try:
+                ok = await self._restart_tunnels()
+            except Exception as e:
+                self.log(f"Supervisor: restart failed: {e}")
+                ok = False
+            if not self.supervising:
+                return
+            if ok:
+                self._recovered_at = time.monotonic()
+                self.log(f"Supervisor: tunnels back after {time.monotonic() - started:.1f} s, restoring devices...")
+                await asyncio.gather(*(device.resume() for device in self.devices.values()))
+                return
+
+            self.set_state(STATE_ERROR)
+            self.log(f"Supervisor: devices did not come back; retrying in {self._reconnect_delay:g} s")
+            await asyncio.sleep(self._reconnect_delay)
+            self._reconnect_delay = min(self._reconnect_delay * 2, RECONNECT_BACKOFF_MAX)
+
+    async def _health_loop(self):
+        """Periodically checks the tunnels and each RSD endpoint."""
+        while self.supervising:
+            await asyncio.sleep(HEALTH_INTERVAL)
+            if not self.auto_reconnect or (self._recovery_task and not self._recovery_task.done()):
+                continue
+            for name, proc in (("Tunnel A", self.proc_tunnel_a), ("Tunnel B", self.proc_tunnel_b)):
+                if proc and proc.returncode is not None:
+                    self._schedule_recovery(f"{name} is gone", "exit")
+            # Mock endpoints are not real sockets, so only the process checks apply there
+            if self.is_mock:
+                continue
+            for device in [d for d in self.devices.values() if d.rsd_ip]:
+                if await device.probe():
+                    device.health_failures = 0
+                    continue
+                device.health_failures += 1
+                metrics.HEALTH_PROBE_FAILURES.inc()
+                if device.health_failures >= HEALTH_FAILURES:
+                    device.log(f"WARNING: RSD {device.rsd_ip} {device.rsd_port} unreachable "
+                               f"for {device.health_failures} probes")
+                    device.health_failures = 0
+                    self._schedule_recovery(f"RSD of {device.name} is stale", "stale_rsd")
+                    break
+
+    @metrics.timed("start_tunnel_a")
     async def start_tunnel_a(self):
         if self.state != STATE_STOPPED and self.state != STATE_ERROR:
             self.log("Services already running or starting.")
             return
 
         self.set_state(STATE_STARTING)
-        self.rsd_ip = None
-        self.rsd_port = None
+        self.supervising = True
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_loop())
 
         try:
-            # 1. Start Tunnel A
+            # 1. Start Tunnel A (tunneld serves every attached device)
             cmd_a = self._get_command("tunnel_a")
             self.log(f"Starting Tunnel A: {' '.join(cmd_a)}")
             
@@ -114,28 +887,28 @@ class ProcessManager:
             env = os.environ.copy()
             env["PYTHONUNBUFFERED"] = "1"
 
-            self.proc_tunnel_a = await asyncio.create_subprocess_exec(
-                *cmd_a,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT,
-                env=env
-            )
-            asyncio.create_task(self._read_stream(self.proc_tunnel_a.stdout, "Tunnel A"))
-            asyncio.create_task(self._wait_for_exit(self.proc_tunnel_a, "Tunnel A"))
+            self.proc_tunnel_a = await self.processes.spawn("tunnel_a", cmd_a, env=env, limit=STREAM_LIMIT)
+            self.processes.track(self.proc_tunnel_a,
+                                 self._read_stream(self.proc_tunnel_a.stdout, "Tunnel A"),
+                                 self._wait_for_exit(self.proc_tunnel_a, "Tunnel A"))
+            self.discovery.start()
             
-            self.set_state(STATE_TUNNEL_A_RUNNING)
+            if self.state == STATE_STARTING:
+                self.set_state(STATE_TUNNEL_A_RUNNING)
 
         except Exception as e:
             self.log(f"CRITICAL ERROR starting Tunnel A: {e}")
             self.set_state(STATE_ERROR)
             await self.stop_services()
 
+    @metrics.timed("start_tunnel_b")
     async def start_tunnel_b(self):
         if self.state != STATE_TUNNEL_A_RUNNING:
             self.log("Tunnel A must be running before starting Tunnel B.")
             return
 
         self.set_state(STATE_STARTING)
+        self.tunnel_b_used = True
 
         try:
             # 2. Start Tunnel B
@@ -146,153 +919,332 @@ class ProcessManager:
             env = os.environ.copy()
             env["PYTHONUNBUFFERED"] = "1"
 
-            self.proc_tunnel_b = await asyncio.create_subprocess_exec(
-                *cmd_b,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT,
-                env=env
-            )
-            asyncio.create_task(self._read_stream(self.proc_tunnel_b.stdout, "Tunnel B", rsd_parser=True))
-            asyncio.create_task(self._wait_for_exit(self.proc_tunnel_b, "Tunnel B"))
+            self.proc_tunnel_b = await self.processes.spawn("tunnel_b", cmd_b, env=env, limit=STREAM_LIMIT)
+            self.processes.track(self.proc_tunnel_b,
+                                 self._read_stream(self.proc_tunnel_b.stdout, "Tunnel B", rsd_parser=True),
+                                 self._wait_for_exit(self.proc_tunnel_b, "Tunnel B"))
 
         except Exception as e:
             self.log(f"CRITICAL ERROR starting Tunnel B: {e}")
             self.set_state(STATE_ERROR)
             await self.stop_services()
 
-    async def set_location(self, lat: str, lon: str):
-        if not self.rsd_ip or not self.rsd_port:
-            self.log("ERROR: RSD Connection info not found yet.")
-            return
+    async def _wait_for_rsd(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not any(device.rsd_ip for device in self.devices.values()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._rsd_changed.clear()
+            try:
+                await asyncio.wait_for(self._rsd_changed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    @metrics.timed("connect")
+    async def connect(self, timeout: float = CONNECT_TIMEOUT,
+                      tunnel_b_after: float = CONNECT_TUNNEL_B_AFTER) -> dict:
+        """Brings everything up in one go, each stage starting as soon as the previous one is ready.
+
+        Tunnel A -> tunneld API answering -> an RSD endpoint (from tunneld, or
+        from Tunnel B if tunneld still lists nothing after tunnel_b_after
+        seconds) -> location sessions started, so the first teleport is
+        immediate. Returns {"ok", "error", "stages"}, where stages maps each
+        stage to the ms since connect() was called.
+        """
+        started = time.monotonic()
+        stages = {}
 
-        # Check and kill existing Sim process
-        if self.proc_sim:
-            old_proc = self.proc_sim
-            self.proc_sim = None # Detach first so _wait_for_exit ignores it
-            self.log("Stopping previous simulation process...")
-            await self._kill_process(old_proc)
+        def mark(stage: str):
+            stages[stage] = round((time.monotonic() - started) * 1000, 1)
+
+        def result(error: Optional[str] = None) -> dict:
+            breakdown = ", ".join(f"{stage} {ms:.0f} ms" for stage, ms in stages.items())
+            self.log(f"Connect {'failed: ' + error if error else 'done'} ({breakdown or 'no stage finished'})")
+            return {"ok": error is None, "error": error, "stages": stages}
+
+        if self.state in (STATE_STOPPED, STATE_ERROR):
+            await self.start_tunnel_a()
+            if self.state in (STATE_STOPPED, STATE_ERROR):
+                return result("Tunnel A did not start")
+            mark("tunnel_a_started")
 
         try:
-            cmd_c = self._get_command("set_location", self.rsd_ip, self.rsd_port, lat, lon)
-            self.log(f"Setting Location: {' '.join(cmd_c)}")
+            await asyncio.wait_for(self.discovery.ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return result("tunneld API did not answer")
+        mark("tunneld_api_ready")
 
-            self.proc_sim = await asyncio.create_subprocess_exec(
-                *cmd_c,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT
-            )
-            asyncio.create_task(self._read_stream(self.proc_sim.stdout, "Simulate"))
-            asyncio.create_task(self._wait_for_exit(self.proc_sim, "Simulate"))
+        remaining = lambda: max(0.0, timeout - (time.monotonic() - started))
+        if not await self._wait_for_rsd(min(tunnel_b_after, remaining())):
+            if self.state == STATE_TUNNEL_A_RUNNING:
+                self.log("Connect: tunneld lists no device yet, starting Tunnel B")
+                await self.start_tunnel_b()
+                mark("tunnel_b_started")
+            if not await self._wait_for_rsd(remaining()):
+                return result("no device found")
+        mark("rsd_found")
 
-            self.set_state(STATE_SIMULATING)
+        ready = [device for device in self.devices.values() if device.rsd_ip]
+        outcomes = await asyncio.gather(*(asyncio.wait_for(device.prewarm(), timeout=remaining())
+                                          for device in ready), return_exceptions=True)
+        failed = [device.name for device, outcome in zip(ready, outcomes) if isinstance(outcome, BaseException)]
+        mark("sessions_ready")
+        if len(failed) == len(ready):
+            return result("location session did not start")
+        if failed:
+            self.log(f"Connect: location session failed for {', '.join(failed)}")
+        return result()
 
-        except Exception as e:
-            self.log(f"ERROR setting location: {e}")
+    async def set_location(self, lat: str, lon: str, udid: Optional[str] = None) -> bool:
+        device = self._resolve(udid)
+        return await device.set_location(lat, lon) if device else False
 
-    async def play_route(self, gpx_path: str, noise: str):
-        if not self.rsd_ip or not self.rsd_port:
-            self.log("ERROR: RSD Connection info not found yet.")
-            return
+    async def play_route(self, gpx_path: str, noise: str, tolerance: float = 0.0,
+                         step: float = 0.0, target_speed: float = 0.0, udid: Optional[str] = None,
+                         noise_model: Optional[NoiseModel] = None, speed: float = 1.0) -> bool:
+        device = self._resolve(udid)
+        return await device.play_route(gpx_path, noise, tolerance, step, target_speed, noise_model,
+                                       speed=speed) if device else False
 
-        # Check and kill existing Sim process
-        if self.proc_sim:
-            old_proc = self.proc_sim
-            self.proc_sim = None # Detach first so _wait_for_exit ignores it
-            self.log("Stopping previous simulation process...")
-            await self._kill_process(old_proc)
+    def _player(self, udid: Optional[str]) -> Optional[RoutePlayer]:
+        device = self.devices.get(udid) if udid else self.device
+        return device.player if device else None
 
-        try:
-            cmd_play = self._get_command("play", self.rsd_ip, self.rsd_port, gpx_path, noise)
-            self.log(f"Playing Route: {' '.join(cmd_play)}")
+    def _players(self, udid: Optional[str], fleet: bool) -> list[RoutePlayer]:
+        """The player of one device, or with fleet=True of every device playing a route."""
+        if fleet:
+            return [device.player for device in self.devices.values() if device.player]
+        player = self._player(udid)
+        return [player] if player else []
 
-            self.proc_sim = await asyncio.create_subprocess_exec(
-                *cmd_play,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT
-            )
-            asyncio.create_task(self._read_stream(self.proc_sim.stdout, "Simulate"))
-            asyncio.create_task(self._wait_for_exit(self.proc_sim, "Simulate"))
+    @staticmethod
+    def _devices_note(players: list[RoutePlayer], fleet: bool) -> str:
+        return f" on {len(players)} devices" if fleet else ""
 
-            self.set_state(STATE_SIMULATING)
+    def pause_route(self, udid: Optional[str] = None, fleet: bool = False) -> bool:
+        players = self._players(udid, fleet)
+        for player in players:
+            player.pause()
+        if players:
+            self.log(f"Route paused{self._devices_note(players, fleet)}.")
+        return bool(players)
+
+    def resume_route(self, udid: Optional[str] = None, fleet: bool = False) -> bool:
+        players = self._players(udid, fleet)
+        for player in players:
+            player.resume()
+        if players:
+            self.log(f"Route resumed{self._devices_note(players, fleet)}.")
+        return bool(players)
+
+    def set_route_speed(self, speed: float, udid: Optional[str] = None, fleet: bool = False) -> bool:
+        players = self._players(udid, fleet)
+        for player in players:
+            player.set_speed(speed)
+        if players:
+            self.log(f"Route speed set to {players[0].speed:g}x{self._devices_note(players, fleet)}")
+        return bool(players)
 
+    def seek_route(self, distance: Optional[float] = None, seconds: Optional[float] = None,
+                   udid: Optional[str] = None) -> bool:
+        player = self._player(udid)
+        if player:
+            player.seek(distance=distance, seconds=seconds)
+        return player is not None
+
+    async def add_route(self, gpx_path: str, name: str, digest: Optional[str] = None) -> Optional[dict]:
+        """Parses a GPX into the route cache and files it in the library; returns its entry."""
+        try:
+            if digest:
+                self.route_cache.remember_digest(gpx_path, digest)
+            else:
+                digest = await asyncio.to_thread(self.route_cache.digest, gpx_path)
+            route, _ = await asyncio.to_thread(self.route_cache.load, gpx_path)
+            entry = await asyncio.to_thread(self.route_library.ingest, gpx_path, name, digest, route)
+            self.log(f"Route library: added {name} ({entry['points']} points, {entry['length'] / 1000:.1f} km)")
+            return entry
         except Exception as e:
-            self.log(f"ERROR playing route: {e}")
+            self.log(f"ERROR adding route {name}: {e}")
+            return None
 
-    async def clear_location(self):
-        # Kill existing simulation first
-        if self.proc_sim:
-            old_proc = self.proc_sim
-            self.proc_sim = None
-            await self._kill_process(old_proc)
+    def route_position(self, udid: Optional[str] = None) -> Optional[dict]:
+        player = self._player(udid)
+        return player.position() if player else None
 
-        if self.state == STATE_SIMULATING:
-             self.set_state(STATE_CONNECTED)
+    def follow_location(self, lat: str, lon: str, udid: Optional[str] = None):
+        device = self.devices.get(udid) if udid else self.device
+        if device and device.rsd_ip:
+            device.follow_location(lat, lon)
 
+    async def clear_location(self, udid: Optional[str] = None) -> bool:
+        device = self.devices.get(udid) if udid else self.device
+        if device and device.rsd_ip:
+            return await device.clear_location()
+
+        # No device session to use: fall back to a one-shot clear
+        if self.journal:
+            self.journal.record(udid or self.selected, SOURCE_CLEAR)
         try:
             cmd_d = self._get_command("clear_location")
             self.log(f"Clearing Location: {' '.join(cmd_d)}")
 
-            proc = await asyncio.create_subprocess_exec(
-                *cmd_d,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT
-            )
+            proc = await self.processes.spawn("clear_location", cmd_d)
             await proc.communicate()
             self.log("Location cleared.")
+            return True
 
         except Exception as e:
             self.log(f"ERROR clearing location: {e}")
+            return False
 
+    async def replay_journal(self, path: str, speed: float = 1.0, udid: Optional[str] = None) -> bool:
+        """Re-sends a recorded session with its original timing.
+
+        Records go to udid when given, else to the device they were recorded
+        from if it is connected, else to the selected device.
+        """
+        try:
+            reader = JournalReader(path)
+        except (OSError, ValueError) as e:
+            self.log(f"ERROR reading journal: {e}")
+            return False
+
+        async def send(recorded: str, source: int, lat: float, lon: float):
+            device = self.devices.get(udid) if udid else (self.devices.get(recorded) or self.device)
+            if device is None or not device.rsd_ip:
+                raise RuntimeError(f"device {udid or recorded or 'selected'} is not connected")
+            await device.replay_record(source, lat, lon)
+
+        self.log(f"Replaying journal {path}: {len(reader)} records at {speed:g}x")
+        try:
+            await reader.replay(send, speed)
+        except Exception as e:
+            self.log(f"ERROR replaying journal: {e}")
+            return False
+        self.log("Journal replay finished.")
+        return True
+
+    def close_journal(self):
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+
+    @metrics.timed("broadcast")
+    async def broadcast(self, action: str, *args, udids: Optional[list[str]] = None, speed: float = 1.0,
+                        spawn_concurrency: int = FLEET_SPAWN_CONCURRENCY,
+                        write_concurrency: int = FLEET_WRITE_CONCURRENCY,
+                        timeout: float = FLEET_TIMEOUT) -> list[dict]:
+        """Applies set_location / play_route / clear_location to many devices at once.
+
+        Runs in two phases so the devices move together: first every
+        missing location session is started (at most spawn_concurrency at a
+        time) and a route is loaded once for all of them, then the action is
+        sent to all devices (at most write_concurrency in flight). Returns one result per device with
+        its latency measured from the start of the second phase. speed is
+        the playback speed of a broadcast route.
+        """
+        if action not in ("set_location", "play_route", "clear_location"):
+            raise ValueError(f"unknown fleet action: {action}")
+
+        targets = [self.devices.get(udid) for udid in udids] if udids else list(self.devices.values())
+        results = {}
+        for udid, device in zip(udids or [d.udid for d in targets], targets):
+            if device is None or not device.rsd_ip:
+                results[udid] = {"udid": udid, "ok": False, "error": "not connected", "latency_ms": None}
+        ready = [d for d in targets if d is not None and d.rsd_ip]
+
+        spawn_gate = asyncio.Semaphore(spawn_concurrency)
+
+        async def prewarm(device: Device):
+            async with spawn_gate:
+                try:
+                    await asyncio.wait_for(device.prewarm(), timeout=timeout)
+                except Exception as e:
+                    results[device.udid] = {"udid": device.udid, "ok": False,
+                                            "error": f"session: {e or type(e).__name__}", "latency_ms": None}
+
+        kwargs = {"speed": speed} if action == "play_route" else {}
+
+        async def load_route():
+            gpx_path = args[0]
+            tolerance, step, target_speed = (tuple(args[2:5]) + (0.0, 0.0, 0.0))[:3]
+            try:
+                started = time.monotonic()
+                route, hit = await asyncio.to_thread(self.route_cache.load, gpx_path, tolerance, step, target_speed)
+                self.log(f"Fleet route {'loaded from cache' if hit else 'parsed'} in "
+                         f"{(time.monotonic() - started) * 1000:.0f} ms ({len(route)} points)")
+                kwargs["route"] = route
+            except Exception as e:
+                self.log(f"ERROR loading fleet route: {e}")
+                for device in ready:
+                    results.setdefault(device.udid, {"udid": device.udid, "ok": False,
+                                                     "error": f"route: {e}", "latency_ms": None})
+
+        await asyncio.gather(*(prewarm(d) for d in ready), *((load_route(),) if action == "play_route" else ()))
+
+        write_gate = asyncio.Semaphore(write_concurrency)
+        started = time.monotonic()
+
+        async def apply(device: Device):
+            async with write_gate:
+                try:
+                    ok = await asyncio.wait_for(getattr(device, action)(*args, **kwargs), timeout=timeout)
+                    error = None if ok else "failed (see log)"
+                except asyncio.TimeoutError:
+                    ok, error = False, f"timed out after {timeout:g} s"
+                results[device.udid] = {"udid": device.udid, "ok": ok, "error": error,
+                                        "latency_ms": (time.monotonic() - started) * 1000}
+
+        await asyncio.gather(*(apply(d) for d in ready if d.udid not in results))
+
+        done = [r["latency_ms"] for r in results.values() if r["ok"]]
+        if done:
+            self.log(f"Fleet {action}: {len(done)}/{len(results)} devices ok, "
+                     f"spread {max(done) - min(done):.0f} ms, slowest {max(done):.0f} ms")
+        else:
+            self.log(f"Fleet {action}: no device succeeded")
+        return list(results.values())
+
+    @metrics.timed("stop_services")
     async def stop_services(self):
         self.log("Stopping all services...")
 
-        tasks = []
-        if self.proc_sim:
-            tasks.append(self._kill_process(self.proc_sim))
+        # Stopping on purpose: nothing to supervise any more
+        self.supervising = False
+        current = asyncio.current_task()
+        for task in (self._health_task, self._recovery_task):
+            if task and task is not current and not task.done():
+                task.cancel()
+        self._health_task = None
+        self._recovery_task = None
+        self.tunnel_b_used = False
+
+        tasks = [device.stop() for device in self.devices.values()]
+        tasks.append(self.discovery.stop())
         if self.proc_tunnel_b:
-            tasks.append(self._kill_process(self.proc_tunnel_b))
+            tasks.append(self.processes.kill(self.proc_tunnel_b))
         if self.proc_tunnel_a:
-            tasks.append(self._kill_process(self.proc_tunnel_a))
+            tasks.append(self.processes.kill(self.proc_tunnel_a))
 
         # Detach references immediately so _wait_for_exit doesn't trigger Error state
-        self.proc_sim = None
         self.proc_tunnel_b = None
         self.proc_tunnel_a = None
-        self.rsd_ip = None
-        self.rsd_port = None
+        self.devices = {}
+        self.selected = None
 
-        if tasks:
-            await asyncio.gather(*tasks)
+        await asyncio.gather(*tasks)
+        # Anything else still alive (e.g. a one-shot clear)
+        await self.processes.kill_all()
+        if self.journal:
+            self.journal.flush()
 
+        if self.devices_callback:
+            self.devices_callback([])
         self.set_state(STATE_STOPPED)
         self.log("All services stopped.")
 
-    async def _kill_process(self, proc: asyncio.subprocess.Process):
-        if proc.returncode is not None:
-            return
-
-        pid = proc.pid
-        self.log(f"Killing process {pid}...")
-
-        try:
-            proc.terminate()
-            try:
-                await asyncio.wait_for(proc.wait(), timeout=2.0)
-            except asyncio.TimeoutError:
-                self.log(f"Process {pid} did not terminate, forcing kill...")
-                if self.is_mock:
-                     proc.kill()
-                else:
-                    subprocess.run(
-                        ["taskkill", "/F", "/T", "/PID", str(pid)],
-                        stdout=subprocess.DEVNULL,
-                        stderr=subprocess.DEVNULL
-                    )
-        except ProcessLookupError:
-            pass
-        except Exception as e:
-            self.log(f"Error killing process {pid}: {e}")
-
     def _get_command(self, cmd_type: str, *args) -> list[str]:
         if self.is_mock:
             base = [sys.executable, "mock_cli.py"]
@@ -300,10 +1252,8 @@ class ProcessManager:
                 return base + ["tunnel_a"]
             elif cmd_type == "tunnel_b":
                 return base + ["tunnel_b"]
-            elif cmd_type == "set_location":
-                return base + ["set_location", "--", args[2], args[3]]
-            elif cmd_type == "play":
-                 return base + ["play", "--", args[2], args[3]]
+            elif cmd_type == "location_session":
+                return base + ["location_session", "--rsd", args[0], args[1]]
             elif cmd_type == "clear_location":
                 return base + ["clear_location"]
         else:
@@ -311,20 +1261,9 @@ class ProcessManager:
                 return ["pymobiledevice3", "remote", "tunneld"]
             elif cmd_type == "tunnel_b":
                 return ["pymobiledevice3", "lockdown", "start-tunnel"]
-            elif cmd_type == "set_location":
-                rsd_ip, rsd_port, lat, lon = args
-                return [
-                    "pymobiledevice3", "developer", "dvt", "simulate-location", "set",
-                    "--rsd", rsd_ip, rsd_port,
-                    "--", lat, lon
-                ]
-            elif cmd_type == "play":
-                rsd_ip, rsd_port, gpx_path, noise = args
-                return [
-                    "pymobiledevice3", "developer", "dvt", "simulate-location", "play",
-                    "--rsd", rsd_ip, rsd_port,
-                    "--", gpx_path, noise
-                ]
+            elif cmd_type == "location_session":
+                rsd_ip, rsd_port = args
+                return [sys.executable, "location_worker.py", "--rsd", rsd_ip, rsd_port]
             elif cmd_type == "clear_location":
                 return ["pymobiledevice3", "developer", "dvt", "simulate-location", "clear"]
         return []
@@ -0,0 +1,147 @@
+"""Spawning and teardown of every child process, without blocking the event loop.
+
+Each child starts in its own process group (a new session on POSIX, a new
+console process group on Windows), so a signal reaches pymobiledevice3
+and anything it started. The tasks that read a child's output or wait
+for its exit are tracked with it and cancelled once it is gone, even if
+a stray grandchild still holds its stdout open. Teardown escalates from
+a polite signal to a forced group kill within fixed time limits.
+"""
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+from typing import Callable, Coroutine, Optional
+
+import metrics
+
+TERM_TIMEOUT = 2.0 # seconds for a child to exit after the polite signal
+KILL_TIMEOUT = 1.0 # seconds to wait after the forced kill
+READER_GRACE = 0.5 # seconds for output readers to drain after exit
+
+IS_WINDOWS = sys.platform == 'win32'
+
+
+class Child:
+    __slots__ = ("name", "proc", "tasks")
+
+    def __init__(self, name: str, proc: asyncio.subprocess.Process):
+        self.name = name
+        self.proc = proc
+        self.tasks: list[asyncio.Task] = []
+
+
+class ProcessSupervisor:
+    def __init__(self, log: Callable[[str], None]):
+        self.log = log
+        self.children: dict[int, Child] = {}
+
+    async def spawn(self, name: str, cmd: list[str], env: Optional[dict] = None,
+                    stdin: bool = False, limit: int = 2 ** 16) -> asyncio.subprocess.Process:
+        """Starts cmd in a new process group, stdout and stderr merged into one pipe."""
+        if IS_WINDOWS:
+            group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group = {"start_new_session": True}
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE if stdin else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env=env,
+            limit=limit,
+            **group
+        )
+        metrics.PROCESS_SPAWNS.inc(process=name)
+        child = self.children[proc.pid] = Child(name, proc)
+        child.tasks.append(asyncio.create_task(self._reap(child)))
+        return proc
+
+    def track(self, proc: asyncio.subprocess.Process, *coros: Coroutine):
+        """Runs coroutines (output readers, exit watchers) that live and die with proc."""
+        child = self.children.get(proc.pid)
+        for coro in coros:
+            task = asyncio.create_task(coro)
+            if child is not None and child.proc is proc:
+                child.tasks.append(task)
+
+    async def _reap(self, child: Child):
+        await child.proc.wait()
+        if not IS_WINDOWS:
+            # Stragglers in the group would keep the pipe (and our readers) alive
+            self._signal_group(child.proc, signal.SIGKILL)
+        await self._finish(child)
+
+    async def _finish(self, child: Child):
+        current = asyncio.current_task()
+        others = [task for task in child.tasks if task is not current and not task.done()]
+        if others:
+            _, pending = await asyncio.wait(others, timeout=READER_GRACE)
+            for task in pending:
+                task.cancel()
+        if self.children.get(child.proc.pid) is child:
+            del self.children[child.proc.pid]
+
+    def _signal_group(self, proc: asyncio.subprocess.Process, sig) -> bool:
+        try:
+            if IS_WINDOWS:
+                # Only console control events reach a whole process group on Windows
+                proc.send_signal(signal.CTRL_BREAK_EVENT)
+            else:
+                os.killpg(proc.pid, sig)
+            return True
+        except (ProcessLookupError, PermissionError, OSError):
+            return False
+
+    async def _force(self, proc: asyncio.subprocess.Process):
+        if not IS_WINDOWS:
+            self._signal_group(proc, signal.SIGKILL)
+            return
+        # taskkill /T walks the process tree; run it without blocking the loop
+        try:
+            killer = await asyncio.create_subprocess_exec(
+                "taskkill", "/F", "/T", "/PID", str(proc.pid),
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+            await asyncio.wait_for(killer.wait(), timeout=KILL_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            proc.kill()
+
+    async def kill(self, proc: asyncio.subprocess.Process, timeout: float = TERM_TIMEOUT):
+        """Stops proc and its process group: polite signal, then a forced kill after timeout."""
+        child = self.children.get(proc.pid)
+        if proc.returncode is None:
+            pid = proc.pid
+            self.log(f"Killing process {pid}...")
+            metrics.PROCESS_KILLS.inc()
+            try:
+                if not self._signal_group(proc, signal.SIGTERM if not IS_WINDOWS else None):
+                    proc.terminate()
+                try:
+                    await asyncio.wait_for(proc.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    self.log(f"Process {pid} did not terminate, forcing kill...")
+                    metrics.PROCESS_FORCED_KILLS.inc()
+                    await self._force(proc)
+                    try:
+                        await asyncio.wait_for(proc.wait(), timeout=KILL_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        self.log(f"ERROR: Process {pid} is still running after a forced kill")
+            except ProcessLookupError:
+                pass
+            except Exception as e:
+                self.log(f"Error killing process {pid}: {e}")
+        if child is not None:
+            await self._finish(child)
+
+    async def kill_all(self):
+        await asyncio.gather(*(self.kill(child.proc) for child in list(self.children.values())))
+
+    def terminate_all(self):
+        """Sends the polite signal to every child group without waiting, for exit paths that cannot await."""
+        for child in list(self.children.values()):
+            if child.proc.returncode is None and not self._signal_group(child.proc, signal.SIGTERM if not IS_WINDOWS else None):
+                try:
+                    child.proc.terminate()
+                except ProcessLookupError:
+                    pass
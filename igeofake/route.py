@@ -0,0 +1,121 @@
+import hashlib
+import math
+import xml.etree.ElementTree as ET
+from array import array
+from datetime import datetime, timezone
+
+# Copy buffer for streaming uploads to disk
+CHUNK_SIZE = 1024 * 1024
+
+POINT_TAGS = ('trkpt', 'rtept')
+
+
+class Route:
+    """Track points stored column-wise in typed arrays.
+
+    lat/lon/ele/time are array('d') columns (8 bytes per value), so a route
+    costs 32 bytes per point instead of one Python object per point. Missing
+    elevations and timestamps are stored as NaN; time is unix seconds.
+    """
+
+    __slots__ = ('lat', 'lon', 'ele', 'time')
+
+    def __init__(self):
+        self.lat = array('d')
+        self.lon = array('d')
+        self.ele = array('d')
+        self.time = array('d')
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def append(self, lat: float, lon: float, ele: float = math.nan, t: float = math.nan):
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.ele.append(ele)
+        self.time.append(t)
+
+    @property
+    def has_time(self) -> bool:
+        return len(self) > 0 and not any(math.isnan(t) for t in self.time)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(col.itemsize * len(col) for col in (self.lat, self.lon, self.ele, self.time))
+
+
+def _local(tag: str) -> str:
+    # Strip the GPX 1.0/1.1 namespace
+    return tag.rsplit('}', 1)[-1]
+
+
+def _parse_time(text: str) -> float:
+    return datetime.fromisoformat(text.strip().replace('Z', '+00:00')).timestamp()
+
+
+def read_gpx(path: str) -> Route:
+    """Incrementally parses track/route points from a GPX file.
+
+    Each point element is detached from its parent as soon as it has been
+    read, so the element tree never grows beyond the current point and
+    memory stays bounded by the Route arrays themselves.
+    """
+    route = Route()
+    stack = []
+    for event, elem in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        if _local(elem.tag) not in POINT_TAGS:
+            continue
+
+        ele = t = math.nan
+        for child in elem:
+            name = _local(child.tag)
+            if name == 'ele' and child.text:
+                ele = float(child.text)
+            elif name == 'time' and child.text:
+                t = _parse_time(child.text)
+        route.append(float(elem.get('lat')), float(elem.get('lon')), ele, t)
+
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+    return route
+
+
+def save_stream(src, dest_path: str, chunk_size: int = CHUNK_SIZE) -> tuple[int, str]:
+    """Copies a file-like object to dest_path in fixed-size chunks.
+
+    Returns (bytes written, SHA-256 hex digest of the content).
+    """
+    written = 0
+    h = hashlib.sha256()
+    with open(dest_path, 'wb') as f:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            f.write(chunk)
+            h.update(chunk)
+            written += len(chunk)
+    return written, h.hexdigest()
+
+
+def write_gpx(route: Route, path: str):
+    """Writes a Route as a single-track GPX 1.1 file, one point at a time."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<gpx version="1.1" creator="iGeoFake" xmlns="http://www.topografix.com/GPX/1/1">\n')
+        f.write('<trk><trkseg>\n')
+        for lat, lon, ele, t in zip(route.lat, route.lon, route.ele, route.time):
+            f.write(f'<trkpt lat="{lat:.7f}" lon="{lon:.7f}">')
+            if not math.isnan(ele):
+                f.write(f'<ele>{ele:.2f}</ele>')
+            if not math.isnan(t):
+                stamp = datetime.fromtimestamp(t, timezone.utc).isoformat(timespec='milliseconds')
+                f.write(f'<time>{stamp.replace("+00:00", "Z")}</time>')
+            f.write('</trkpt>\n')
+        f.write('</trkseg></trk>\n</gpx>\n')
@@ -0,0 +1,201 @@
+"""Content-addressed cache of parsed and preprocessed routes.
+
+Entries are keyed by the SHA-256 of the GPX bytes plus the preprocessing
+parameters. Each entry is stored on disk as a small header followed by the
+raw float64 lat/lon/ele/time columns, so loading it is a straight read
+into typed arrays with no XML parsing. An in-memory LRU sits on top, and
+the disk store is trimmed least-recently-used first to a byte budget.
+
+The cache is used from worker threads: its in-memory state is guarded by
+a lock, and concurrent loads of the same entry wait for one build.
+"""
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional
+
+from preprocess import preprocess
+from route import CHUNK_SIZE, Route, read_gpx
+
+CACHE_DIR = 'route_cache'
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+MEMORY_MAX_BYTES = 128 * 1024 * 1024
+
+# magic, format version, point count
+HEADER = struct.Struct('<4sIQ')
+MAGIC = b'IGFR'
+VERSION = 1
+
+
+def file_digest(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(digest: str, tolerance: float = 0.0, step: float = 0.0, speed: float = 0.0) -> str:
+    params = f"{digest}:{float(tolerance)!r}:{float(step)!r}:{float(speed)!r}"
+    return hashlib.sha256(params.encode()).hexdigest()[:32]
+
+
+def dump_route(route: Route, path: str):
+    # A unique temporary name per writer, so concurrent dumps never rename each other's file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path), suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(route)))
+            for col in (route.lat, route.lon, route.ele, route.time):
+                col.tofile(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def load_route(path: str) -> Route:
+    route = Route()
+    with open(path, 'rb') as f:
+        magic, version, n = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"not a route cache file: {path}")
+        for col in (route.lat, route.lon, route.ele, route.time):
+            col.fromfile(f, n)
+    return route
+
+
+class RouteCache:
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES,
+                 memory_max_bytes: int = MEMORY_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self._memory: OrderedDict[str, Route] = OrderedDict()
+        self._memory_bytes = 0
+        # (path, size, mtime_ns) -> digest, so unchanged files are hashed once
+        self._digests: dict[tuple, str] = {}
+        self._lock = threading.Lock()
+        self._building: dict[str, Future] = {} # key -> build in progress, shared by concurrent loads
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def digest(self, gpx_path: str) -> str:
+        st = os.stat(gpx_path)
+        stamp = (os.path.abspath(gpx_path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(stamp)
+        if digest is None:
+            digest = file_digest(gpx_path)
+            with self._lock:
+                self._digests[stamp] = digest
+        return digest
+
+    def remember_digest(self, gpx_path: str, digest: str):
+        """Records a digest computed elsewhere (e.g. while streaming an upload)."""
+        st = os.stat(gpx_path)
+        with self._lock:
+            self._digests[(os.path.abspath(gpx_path), st.st_size, st.st_mtime_ns)] = digest
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.route")
+
+    def _remember(self, key: str, route: Route):
+        # Called with the lock held
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = route
+        self._memory_bytes += route.nbytes
+        while self._memory_bytes > self.memory_max_bytes and len(self._memory) > 1:
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= old.nbytes
+
+    def get(self, key: str) -> Optional[Route]:
+        with self._lock:
+            route = self._memory.get(key)
+            if route is not None:
+                self._memory.move_to_end(key)
+                return route
+
+        path = self._entry_path(key)
+        try:
+            route = load_route(path)
+            os.utime(path) # mtime doubles as the disk LRU clock
+        except (FileNotFoundError, ValueError, EOFError, struct.error):
+            return None
+        with self._lock:
+            self._remember(key, route)
+        return route
+
+    def put(self, key: str, route: Route):
+        dump_route(route, self._entry_path(key))
+        with self._lock:
+            self._remember(key, route)
+            self._evict()
+
+    def _evict(self):
+        # Called with the lock held
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.route'):
+                st = os.stat(os.path.join(self.directory, name))
+                entries.append((st.st_mtime_ns, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            self._memory_bytes -= getattr(self._memory.pop(name[:-len('.route')], None), 'nbytes', 0)
+            total -= size
+
+    def load(self, gpx_path: str, tolerance: float = 0.0, step: float = 0.0, speed: float = 0.0) -> tuple[Route, bool]:
+        """Returns (route, hit); parses and preprocesses the GPX on a miss.
+
+        Blocking; run it in a worker thread from async code.
+        """
+        key = cache_key(self.digest(gpx_path), tolerance, step, speed)
+        with self._lock:
+            building = self._building.get(key)
+            owner = building is None
+            if owner:
+                building = self._building[key] = Future()
+        if not owner:
+            # Someone else is loading this entry; share their result
+            route = building.result()
+            with self._lock:
+                self.hits += 1
+            return route, True
+
+        try:
+            route = self.get(key)
+            hit = route is not None
+            if not hit:
+                with self._lock:
+                    self.misses += 1
+                if tolerance or step or speed:
+                    # Preprocess from the cached raw parse when we have one
+                    raw, _ = self.load(gpx_path)
+                    route = preprocess(raw, tolerance, step, speed)
+                else:
+                    route = read_gpx(gpx_path)
+                self.put(key, route)
+            building.set_result(route)
+        except BaseException as e:
+            building.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._building[key]
+        if hit:
+            with self._lock:
+                self.hits += 1
+        return route, hit
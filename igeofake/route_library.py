@@ -0,0 +1,142 @@
+"""Persistent library of ingested routes, indexed in SQLite.
+
+Each route is stored once per content hash with the metadata the UI
+needs (bounding box, length, point count, duration), so listing and
+picking routes never opens a GPX file. An R-tree over the bounding
+boxes answers "routes near this point" without scanning the table.
+
+Blocking; call it from a worker thread in async code. One connection
+is shared between threads behind a lock.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from preprocess import cumulative_distance, timeline
+from route import Route
+
+LIBRARY_DB = os.path.join('uploads', 'library.sqlite3')
+NEAR_RADIUS_M = 1000.0
+METERS_PER_DEGREE = 111_320.0
+
+COLUMNS = ("id", "digest", "name", "path", "added", "points", "length", "duration", "timed",
+           "min_lat", "max_lat", "min_lon", "max_lon")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS routes (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    added REAL NOT NULL,
+    points INTEGER NOT NULL,
+    length REAL NOT NULL,      -- meters
+    duration REAL NOT NULL,    -- seconds, from timestamps or at walking speed
+    timed INTEGER NOT NULL,    -- 1 if the GPX carried timestamps
+    min_lat REAL, max_lat REAL, min_lon REAL, max_lon REAL
+);
+CREATE INDEX IF NOT EXISTS routes_added ON routes (added);
+CREATE INDEX IF NOT EXISTS routes_path ON routes (path);
+CREATE VIRTUAL TABLE IF NOT EXISTS routes_box USING rtree (id, min_lat, max_lat, min_lon, max_lon);
+"""
+
+
+def describe(route: Route) -> dict:
+    """Metadata stored for a route, computed in one vectorized pass."""
+    lat, lon = np.frombuffer(route.lat), np.frombuffer(route.lon)
+    return {
+        "points": len(route),
+        "length": float(cumulative_distance(lat, lon)[-1]),
+        "duration": float(timeline(route)[-1]),
+        "timed": int(len(route) > 0 and not np.isnan(np.frombuffer(route.time)).any()),
+        "min_lat": float(lat.min()), "max_lat": float(lat.max()),
+        "min_lon": float(lon.min()), "max_lon": float(lon.max()),
+    }
+
+
+def box_distance(entry: dict, lat: float, lon: float) -> float:
+    """Approximate meters from a point to a route's bounding box (0 inside it)."""
+    dlat = max(entry["min_lat"] - lat, 0.0, lat - entry["max_lat"])
+    dlon = max(entry["min_lon"] - lon, 0.0, lon - entry["max_lon"])
+    return math.hypot(dlat, dlon * math.cos(math.radians(lat))) * METERS_PER_DEGREE
+
+
+class RouteLibrary:
+    def __init__(self, path: str = LIBRARY_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _rows(self, sql: str, params: tuple = ()) -> list[dict]:
+        with self._lock:
+            return [dict(zip(COLUMNS, row)) for row in self._db.execute(sql, params)]
+
+    def ingest(self, gpx_path: str, name: str, digest: str, route: Route) -> dict:
+        """Adds a parsed route (or renames it if the same content is already stored)."""
+        if not len(route):
+            raise ValueError("route has no points")
+        meta = describe(route)
+        with self._lock, self._db:
+            row = self._db.execute("SELECT id FROM routes WHERE digest = ?", (digest,)).fetchone()
+            if row:
+                route_id = row[0]
+                self._db.execute("UPDATE routes SET name = ?, path = ? WHERE id = ?", (name, gpx_path, route_id))
+            else:
+                route_id = self._db.execute(
+                    "INSERT INTO routes (digest, name, path, added, points, length, duration, timed,"
+                    " min_lat, max_lat, min_lon, max_lon) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (digest, name, gpx_path, time.time(), meta["points"], meta["length"], meta["duration"],
+                     meta["timed"], meta["min_lat"], meta["max_lat"], meta["min_lon"], meta["max_lon"])).lastrowid
+                self._db.execute("INSERT INTO routes_box VALUES (?, ?, ?, ?, ?)",
+                                 (route_id, meta["min_lat"], meta["max_lat"], meta["min_lon"], meta["max_lon"]))
+        return self.get(route_id)
+
+    def get(self, route_id: int) -> Optional[dict]:
+        rows = self._rows(f"SELECT {', '.join(COLUMNS)} FROM routes WHERE id = ?", (int(route_id),))
+        return rows[0] if rows else None
+
+    def find(self, path: str) -> Optional[dict]:
+        rows = self._rows(f"SELECT {', '.join(COLUMNS)} FROM routes WHERE path = ? ORDER BY added DESC LIMIT 1", (path,))
+        return rows[0] if rows else None
+
+    def entries(self, search: Optional[str] = None, limit: int = -1) -> list[dict]:
+        """Routes, newest first, optionally filtered by a name substring."""
+        if search:
+            return self._rows(f"SELECT {', '.join(COLUMNS)} FROM routes WHERE name LIKE ? ORDER BY added DESC LIMIT ?",
+                              (f"%{search}%", limit))
+        return self._rows(f"SELECT {', '.join(COLUMNS)} FROM routes ORDER BY added DESC LIMIT ?", (limit,))
+
+    def near(self, lat: float, lon: float, radius_m: float = NEAR_RADIUS_M, limit: int = 50) -> list[dict]:
+        """Routes whose bounding box comes within radius_m of the point, closest first."""
+        dlat = radius_m / METERS_PER_DEGREE
+        dlon = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        rows = self._rows(
+            f"SELECT {', '.join('r.' + c for c in COLUMNS)} FROM routes_box b JOIN routes r ON r.id = b.id"
+            " WHERE b.max_lat >= ? AND b.min_lat <= ? AND b.max_lon >= ? AND b.min_lon <= ?",
+            (lat - dlat, lat + dlat, lon - dlon, lon + dlon))
+        for row in rows:
+            row["distance"] = box_distance(row, lat, lon)
+        rows = sorted((row for row in rows if row["distance"] <= radius_m), key=lambda row: row["distance"])
+        return rows[:limit]
+
+    def remove(self, route_id: int) -> bool:
+        with self._lock, self._db:
+            removed = self._db.execute("DELETE FROM routes WHERE id = ?", (int(route_id),)).rowcount
+            self._db.execute("DELETE FROM routes_box WHERE id = ?", (int(route_id),))
+        return bool(removed)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM routes").fetchone()[0]
@@ -0,0 +1,110 @@
+"""Device -> RSD endpoint discovery through tunneld's local HTTP API.
+
+`pymobiledevice3 remote tunneld` answers GET / with every tunnel it holds:
+
+    {"00008150-001E6CE20228401C": [{"tunnel-address": "fdae:4871:a659::1",
+                                    "tunnel-port": 55082, "interface": "utun5"}]}
+
+RsdDiscovery polls that over one kept-alive connection and reports only
+changes: a new or moved endpoint goes to on_update, a device that
+disappeared goes to on_remove.
+"""
+import asyncio
+import os
+from typing import Callable, Optional
+
+import httpx
+
+TUNNELD_HOST = '127.0.0.1'
+TUNNELD_PORT = int(os.environ.get('IGEOFAKE_TUNNELD_PORT', '49151'))
+POLL_INTERVAL = 0.5 # seconds
+STARTUP_POLL_INTERVAL = 0.1 # until the API first answers, so a fresh tunneld is picked up quickly
+REQUEST_TIMEOUT = 2.0
+
+
+def parse_tunnels(data: dict) -> dict[str, tuple[str, str]]:
+    """Maps each UDID to the (address, port) of its first tunnel."""
+    endpoints = {}
+    for udid, tunnels in data.items():
+        if tunnels:
+            endpoints[udid] = (str(tunnels[0]['tunnel-address']), str(tunnels[0]['tunnel-port']))
+    return endpoints
+
+
+class RsdDiscovery:
+    def __init__(self, on_update: Callable[[str, str, str], None],
+                 on_remove: Optional[Callable[[str], None]] = None,
+                 log: Optional[Callable[[str], None]] = None,
+                 url: str = f'http://{TUNNELD_HOST}:{TUNNELD_PORT}/',
+                 interval: float = POLL_INTERVAL):
+        self.on_update = on_update
+        self.on_remove = on_remove
+        self.log = log or (lambda message: None)
+        self.url = url
+        self.interval = interval
+
+        self.endpoints: dict[str, tuple[str, str]] = {}
+        self.reachable = False
+        self.ready = asyncio.Event() # set once the API has answered since start()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        # One pooled connection, reused for every poll. Plain HTTP to localhost,
+        # so skip building a TLS context (tens of ms on every tunnel start)
+        self._client = httpx.AsyncClient(timeout=REQUEST_TIMEOUT, verify=False,
+                                         limits=httpx.Limits(max_connections=1, max_keepalive_connections=1))
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+        self.reachable = False
+        self.ready.clear()
+
+    def forget(self):
+        """Drops the known endpoints so the next poll reports every device again."""
+        self.endpoints = {}
+
+    async def poll(self) -> dict[str, tuple[str, str]]:
+        response = await self._client.get(self.url)
+        response.raise_for_status()
+        current = parse_tunnels(response.json())
+
+        for udid, endpoint in current.items():
+            if self.endpoints.get(udid) != endpoint:
+                self.on_update(udid, *endpoint)
+        for udid in self.endpoints.keys() - current.keys():
+            if self.on_remove:
+                self.on_remove(udid)
+        self.endpoints = current
+        return current
+
+    async def _run(self):
+        while True:
+            try:
+                await self.poll()
+                if not self.reachable:
+                    self.log(f"Discovery: tunneld API up at {self.url}")
+                    self.reachable = True
+                    self.ready.set()
+            except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+                # tunneld is still starting, or restarting; keep the last known map
+                if self.reachable:
+                    self.log(f"Discovery: tunneld API unavailable ({e or type(e).__name__})")
+                    self.reachable = False
+            await asyncio.sleep(self.interval if self.reachable else STARTUP_POLL_INTERVAL)
@@ -0,0 +1,185 @@
+"""Timeline scenarios: a list of timed commands played against the ProcessManager.
+
+A scenario is a JSON or YAML file:
+
+    name: geofence entry
+    udid: 00008150-001E6CE20228401C     # optional, default target for every step
+    steps:
+      - {op: set_location, lat: 25.0330, lon: 121.5654}
+      - hold: 30                         # seconds until the next step
+      - {op: play_route, gpx_path: routes/loop.gpx, speed: 2}
+      - hold: 12.5
+      - {op: set_location, lat: 25.0478, lon: 121.5170}
+      - {at: 90, op: clear_location}     # absolute offset from the start
+      - {after: 0.25, op: clear_location}  # relative to the previous step
+
+Steps take the same fields as the /api/commands ops. Every step gets an
+absolute due time from one monotonic anchor, so a late step does not
+push the ones after it back. While waiting, the next step is prepared
+(route parsed into the cache, location session started) so that its
+own work is all that is left at its due time. Each step's start error
+against the plan is logged and recorded in the metrics.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+import metrics
+
+SPIN_WINDOW = 0.002 # seconds before a due time spent yielding to the loop instead of sleeping
+OPS = {"set_location", "play_route", "pause", "resume", "speed", "seek", "clear_location", "select", "broadcast"}
+DEVICE_OPS = {"set_location", "play_route", "clear_location"} # ops that want a live location session
+
+
+async def wait_until(deadline: float):
+    """Returns at a time.monotonic() deadline, within a few microseconds."""
+    # Sleep most of the way, then yield to the loop until the deadline: the
+    # loop's sleep granularity alone would cost up to a millisecond or so
+    remaining = deadline - time.monotonic()
+    if remaining > SPIN_WINDOW:
+        await asyncio.sleep(remaining - SPIN_WINDOW)
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0)
+
+
+def step_ok(value) -> bool:
+    """Whether a command result means success; a broadcast is ok when every device is."""
+    if isinstance(value, dict):
+        return bool(value.get("ok", True))
+    if isinstance(value, list):
+        return all(step_ok(item) for item in value)
+    return value is not False
+
+
+class Step:
+    __slots__ = ("index", "due", "command")
+
+    def __init__(self, index: int, due: float, command: dict):
+        self.index = index
+        self.due = due
+        self.command = command
+
+
+def load_file(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML scenarios need PyYAML (the 'yaml' extra, or pip install pyyaml); JSON works without it")
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f"{path}: invalid YAML: {e}")
+    else:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: invalid JSON: {e}")
+    if not isinstance(data, dict) or not isinstance(data.get("steps"), list):
+        raise ValueError(f"{path}: expected a mapping with a 'steps' list")
+    return data
+
+
+def plan(data: dict, base_dir: str = '.') -> list[Step]:
+    """Turns the steps of a scenario into commands with absolute due times (seconds from start)."""
+    steps = []
+    cursor = 0.0
+    for number, raw in enumerate(data["steps"], 1):
+        if not isinstance(raw, dict):
+            raise ValueError(f"step {number}: expected a mapping, got {raw!r}")
+        command = dict(raw)
+        if "hold" in command:
+            if len(command) != 1:
+                raise ValueError(f"step {number}: 'hold' stands alone")
+            cursor += float(command["hold"])
+            continue
+
+        if "at" in command:
+            at = float(command.pop("at"))
+            if at < cursor:
+                raise ValueError(f"step {number}: at {at:g} s is before the previous step ({cursor:g} s)")
+            cursor = at
+        cursor += float(command.pop("after", 0.0))
+
+        if command.get("op") not in OPS:
+            raise ValueError(f"step {number}: unknown op {command.get('op')!r}")
+        if data.get("udid") and "udid" not in command:
+            command["udid"] = data["udid"]
+        if "gpx_path" in command:
+            command["gpx_path"] = os.path.join(base_dir, command["gpx_path"])
+        steps.append(Step(number, cursor, command))
+    return steps
+
+
+class Scenario:
+    def __init__(self, steps: list[Step], name: Optional[str] = None):
+        self.steps = steps
+        self.name = name or "scenario"
+
+    @classmethod
+    def load(cls, path: str) -> "Scenario":
+        data = load_file(path)
+        base_dir = os.path.dirname(os.path.abspath(path))
+        return cls(plan(data, base_dir), data.get("name") or os.path.basename(path))
+
+    @property
+    def duration(self) -> float:
+        return self.steps[-1].due if self.steps else 0.0
+
+    async def prepare(self, manager, step: Step):
+        """Does the slow part of a step ahead of time; failures surface when the step runs."""
+        command = step.command
+        try:
+            if command["op"] == "play_route" or (command["op"] == "broadcast" and command.get("action") == "play_route"):
+                gpx_path = command.get("gpx_path") or manager.route_library.get(command["route_id"])["path"]
+                await asyncio.to_thread(manager.route_cache.load, gpx_path, float(command.get("tolerance", 0.0)),
+                                        float(command.get("step", 0.0)), float(command.get("target_speed", 0.0)))
+            if command["op"] in DEVICE_OPS:
+                udid = command.get("udid")
+                device = manager.devices.get(udid) if udid else manager.device
+                if device and device.rsd_ip:
+                    await device.prewarm()
+        except Exception as e:
+            manager.log(f"Scenario: could not prepare step {step.index} ({command['op']}): {e}")
+
+    async def run(self, manager, execute: Callable[[dict], Awaitable], stop_on_error: bool = True) -> list[dict]:
+        """Plays the steps through execute(command) and returns one timing result per step."""
+        manager.log(f"Scenario '{self.name}': {len(self.steps)} steps over {self.duration:g} s")
+        if self.steps:
+            await self.prepare(manager, self.steps[0])
+
+        results = []
+        start = time.monotonic()
+        for i, step in enumerate(self.steps):
+            following = self.steps[i + 1] if i + 1 < len(self.steps) else None
+            await wait_until(start + step.due)
+
+            began = time.monotonic()
+            error = began - start - step.due
+            try:
+                value = await execute(step.command)
+                ok = step_ok(value)
+            except (KeyError, ValueError, TypeError) as e:
+                manager.log(f"Scenario step {step.index}: bad command: {e}")
+                ok = False
+            took = time.monotonic() - began
+
+            metrics.SCENARIO_STEP_LATENESS.observe(max(error, 0.0))
+            manager.log(f"Scenario step {step.index} {step.command['op']}: planned {step.due:.3f} s, "
+                        f"error {error * 1000:+.2f} ms, took {took * 1000:.1f} ms{'' if ok else ', FAILED'}")
+            results.append({"step": step.index, "op": step.command["op"], "ok": ok, "planned": step.due,
+                            "error_ms": round(error * 1000, 3), "ms": round(took * 1000, 3)})
+            if not ok and stop_on_error:
+                break
+            if following:
+                await self.prepare(manager, following)
+
+        errors = [abs(r["error_ms"]) for r in results]
+        if errors:
+            manager.log(f"Scenario '{self.name}' done: {sum(r['ok'] for r in results)}/{len(self.steps)} steps ok, "
+                        f"timing error max {max(errors):.2f} ms, mean {sum(errors) / len(errors):.2f} ms")
+        return results
@@ -0,0 +1,178 @@
+"""State shared by every browser tab watching this host.
+
+The ProcessManager reports into one SharedState; each page subscribes a
+view to it. A change is diffed once against the last published snapshot
+and only the keys that changed are handed to the views, so a status
+change or a log batch costs the same to compute no matter how many tabs
+are open. New views get the full snapshot plus a short log backlog.
+
+Route playback positions bypass the snapshot: they are coalesced to
+position_interval and only the latest one goes out, and only while some
+view is subscribed.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import metrics
+
+from process_manager import (STATE_STOPPED, STATE_CONNECTED, STATE_SIMULATING, STATE_ERROR,
+                             STATE_STARTING, STATE_TUNNEL_A_RUNNING)
+
+logger = logging.getLogger(__name__)
+
+LOG_BACKLOG = 200 # lines replayed to a newly opened tab
+POSITION_RATE_HZ = 4.0 # playback positions pushed per second; the browser interpolates in between
+
+STATUS_CLASSES = 'text-red-500 text-green-500 text-blue-500 text-yellow-500 text-gray-500'
+
+# state -> (status colour, tunnel A, tunnel B, stop, set/clear location, play route)
+STATE_CONTROLS = {
+    STATE_STOPPED: ('text-gray-500', True, False, False, False, False),
+    STATE_TUNNEL_A_RUNNING: ('text-yellow-500', False, True, True, False, False),
+    STATE_STARTING: ('text-yellow-500', False, False, True, False, False),
+    STATE_CONNECTED: ('text-green-500', False, False, True, True, True),
+    STATE_SIMULATING: ('text-blue-500', False, False, True, True, True),
+    STATE_ERROR: ('text-red-500', True, False, False, False, False),
+}
+
+
+class SharedState:
+    def __init__(self):
+        self.state = STATE_STOPPED
+        self.devices: list[str] = []
+        self.selected: Optional[str] = None
+        self.route_path: Optional[str] = None # last uploaded GPX, playable from any tab
+        self.route_name: Optional[str] = None
+        self.paused = False
+        self.library_revision = 0 # bumped when the route library changes, so tabs re-list it
+
+        self.position: Optional[dict] = None # selected device's playback position
+        self.position_interval = 1.0 / POSITION_RATE_HZ
+        self._position_sent = float('-inf')
+        self._position_timer: Optional[asyncio.TimerHandle] = None
+
+        self.backlog: deque = deque(maxlen=LOG_BACKLOG)
+        self.views: list[Callable[[dict], None]] = []
+        self._alive: dict[Callable[[dict], None], Callable[[], bool]] = {} # view -> is its tab still there
+        self._published = self.snapshot()
+
+    def snapshot(self) -> dict:
+        colour, tunnel_a, tunnel_b, stop, location, play = STATE_CONTROLS.get(self.state, STATE_CONTROLS[STATE_ERROR])
+        return {
+            "status": self.state,
+            "status_class": colour,
+            "tunnel_a": tunnel_a,
+            "tunnel_b": tunnel_b,
+            "stop": stop,
+            "set_location": location,
+            "clear_location": location,
+            "play_route": play and self.route_path is not None,
+            "route_name": self.route_name,
+            "route_path": self.route_path,
+            "library": self.library_revision,
+            "devices": tuple(self.devices),
+            "selected": self.selected,
+            "paused": self.paused,
+        }
+
+    def subscribe(self, view: Callable[[dict], None], alive: Optional[Callable[[], bool]] = None):
+        """Registers a view and brings it up to date with the snapshot and log backlog.
+
+        alive tells whether the view's tab is still connected; a failing
+        view is only dropped once it is not.
+        """
+        self.views.append(view)
+        if alive is not None:
+            self._alive[view] = alive
+        initial = dict(self._published)
+        if self.backlog:
+            initial["logs"] = "\n".join(self.backlog)
+        if self.position is not None:
+            initial["position"] = self.position
+            initial["position_interval"] = self.position_interval
+        view(initial)
+
+    def unsubscribe(self, view: Callable[[dict], None]):
+        if view in self.views:
+            self.views.remove(view)
+        self._alive.pop(view, None)
+
+    def _send(self, diff: dict):
+        for view in list(self.views):
+            try:
+                view(diff)
+            except Exception:
+                alive = self._alive.get(view)
+                if alive is not None and not alive():
+                    # The tab went away mid-update
+                    self.unsubscribe(view)
+                else:
+                    # A bug in the view; keep it and the other views getting updates
+                    logger.exception("Error updating a view")
+
+    def publish(self):
+        """Sends the keys that changed since the last publish to every view."""
+        current = self.snapshot()
+        diff = {key: value for key, value in current.items() if self._published.get(key) != value}
+        self._published = current
+        if diff:
+            self._send(diff)
+
+    # ProcessManager callbacks
+
+    def on_log(self, message: str):
+        self.backlog.extend(message.split("\n"))
+        self._send({"logs": message})
+
+    def on_status(self, new_state: str):
+        self.state = new_state
+        self.publish()
+        if new_state != STATE_SIMULATING and self.position is not None:
+            self.clear_position()
+
+    def on_position(self, position: dict):
+        self.position = position
+        if self._position_timer is not None:
+            # A send is already scheduled and will carry this position instead
+            metrics.POSITION_COALESCED.inc()
+            return
+        wait = self._position_sent + self.position_interval - time.monotonic()
+        if wait <= 0:
+            self._flush_position()
+        else:
+            self._position_timer = asyncio.get_running_loop().call_later(wait, self._flush_position)
+
+    def _flush_position(self):
+        self._position_timer = None
+        if self.views and self.position is not None:
+            self._position_sent = time.monotonic()
+            self._send({"position": self.position, "position_interval": self.position_interval})
+
+    def clear_position(self):
+        if self._position_timer is not None:
+            self._position_timer.cancel()
+            self._position_timer = None
+        self.position = None
+        self._send({"position": None})
+
+    def on_devices(self, udids: list[str], selected: Optional[str]):
+        self.devices = list(udids)
+        self.selected = selected
+        self.publish()
+
+    def set_route(self, path: Optional[str], name: Optional[str]):
+        self.route_path = path
+        self.route_name = name
+        self.paused = False
+        self.publish()
+
+    def library_changed(self):
+        self.library_revision += 1
+        self.publish()
+
+    def set_paused(self, paused: bool):
+        self.paused = paused
+        self.publish()
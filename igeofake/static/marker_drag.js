@@ -1,3 +1,10 @@
+// Follow-mode update rate per map ID in Hz (0: only report the final position)
+const markerFollowRates = {};
+
+function setMarkerFollowRate(mapId, hz) {
+    markerFollowRates[mapId] = hz;
+}
+
 // Bind drag events to the Leaflet marker
 function bindMarkerDragEvents(mapId) {
     try {
@@ -13,7 +20,37 @@ function bindMarkerDragEvents(mapId) {
                 if (layer instanceof L.Marker && layer.options.draggable) {
                     console.log('Found draggable marker');
 
+                    // Throttle: at most one 'marker-move' per interval, always
+                    // carrying the latest position; older ones are dropped
+                    let lastSent = 0;
+                    let timer = null;
+                    let pending = null;
+
+                    function flush() {
+                        timer = null;
+                        if (!pending) return;
+                        lastSent = Date.now();
+                        emitEvent('marker-move', { lat: pending.lat, lng: pending.lng });
+                        pending = null;
+                    }
+
+                    layer.on('drag', function (e) {
+                        const hz = markerFollowRates[mapId] || 0;
+                        if (hz <= 0) return;
+                        pending = e.target.getLatLng();
+                        const wait = lastSent + 1000 / hz - Date.now();
+                        if (wait <= 0) {
+                            flush();
+                        } else if (!timer) {
+                            timer = setTimeout(flush, wait);
+                        }
+                    });
+
                     layer.on('dragend', function (e) {
+                        // The final position supersedes anything still pending
+                        clearTimeout(timer);
+                        timer = null;
+                        pending = null;
                         const latlng = e.target.getLatLng();
                         console.log('Marker dragged to:', latlng.lat, latlng.lng);
                         emitEvent('marker-drag', { lat: latlng.lat, lng: latlng.lng });
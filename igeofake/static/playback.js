@@ -0,0 +1,79 @@
+// Live route playback per map ID: the marker glides between the coalesced
+// server positions and leaves a trail behind it
+const playbackStates = {};
+const PLAYBACK_TRAIL_MAX = 5000; // points kept in the trail, oldest dropped first
+
+function playbackState(mapId) {
+    if (playbackStates[mapId]) return playbackStates[mapId];
+    const mapElement = getElement(mapId);
+    if (!mapElement || !mapElement.map) return null;
+    const map = mapElement.map;
+
+    let marker = null;
+    map.eachLayer(function (layer) {
+        if (layer instanceof L.Marker && layer.options.draggable) marker = layer;
+    });
+    const state = {
+        map: map,
+        marker: marker,
+        trail: L.polyline([], { color: '#16a34a', weight: 4, opacity: 0.8 }).addTo(map),
+        target: null,
+        index: -1,
+        frame: null,
+        dragging: false,
+    };
+    // Never fight the user for the marker
+    state.onDragStart = () => { state.dragging = true; cancelAnimationFrame(state.frame); };
+    state.onDragEnd = () => { state.dragging = false; };
+    if (marker) {
+        marker.on('dragstart', state.onDragStart);
+        marker.on('dragend', state.onDragEnd);
+    }
+    playbackStates[mapId] = state;
+    return state;
+}
+
+function showPlaybackPosition(mapId, lat, lng, index, intervalMs) {
+    const state = playbackState(mapId);
+    if (!state) return;
+
+    // Seeking back or a new route: start the trail over
+    if (index < state.index) {
+        state.trail.setLatLngs([]);
+        state.target = null;
+    }
+    state.index = index;
+
+    // The trail ends where the marker is heading from; it catches up on the next update
+    if (state.target) {
+        state.trail.addLatLng(state.target);
+        const points = state.trail.getLatLngs();
+        if (points.length > PLAYBACK_TRAIL_MAX) state.trail.setLatLngs(points.slice(-PLAYBACK_TRAIL_MAX));
+    }
+    const to = L.latLng(lat, lng);
+    state.target = to;
+
+    const marker = state.marker;
+    if (!marker || state.dragging) return;
+    cancelAnimationFrame(state.frame);
+    const from = marker.getLatLng();
+    const start = performance.now();
+    function step(now) {
+        const t = intervalMs > 0 ? Math.min((now - start) / intervalMs, 1) : 1;
+        marker.setLatLng([from.lat + (to.lat - from.lat) * t, from.lng + (to.lng - from.lng) * t]);
+        if (t < 1) state.frame = requestAnimationFrame(step);
+    }
+    state.frame = requestAnimationFrame(step);
+}
+
+function clearPlaybackTrail(mapId) {
+    const state = playbackStates[mapId];
+    if (!state) return;
+    cancelAnimationFrame(state.frame);
+    if (state.marker) {
+        state.marker.off('dragstart', state.onDragStart);
+        state.marker.off('dragend', state.onDragEnd);
+    }
+    state.trail.remove();
+    delete playbackStates[mapId];
+}
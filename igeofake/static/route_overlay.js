@@ -0,0 +1,90 @@
+// Route overlays per map ID: the tier matching the zoom is fetched as
+// encoded polylines (see polyline.py); unclipped tiers are cached per tier
+const routeOverlays = {};
+
+// Google encoded-polyline string -> [[lat, lng], ...]
+function decodePolyline(str) {
+    const points = [];
+    let index = 0, lat = 0, lng = 0;
+    while (index < str.length) {
+        for (let axis = 0; axis < 2; axis++) {
+            let result = 0, shift = 0, b;
+            do {
+                b = str.charCodeAt(index++) - 63;
+                result |= (b & 0x1f) << shift;
+                shift += 5;
+            } while (b >= 0x20);
+            const delta = (result & 1) ? ~(result >> 1) : (result >> 1);
+            if (axis === 0) lat += delta; else lng += delta;
+        }
+        points.push([lat / 1e5, lng / 1e5]);
+    }
+    return points;
+}
+
+function drawRouteOverlay(overlay, data) {
+    if (overlay.drawn === data) return;
+    overlay.drawn = data;
+    overlay.layer.clearLayers();
+    for (const encoded of data.polylines) {
+        L.polyline(decodePolyline(encoded), { color: '#2563eb', weight: 3, opacity: 0.8 }).addTo(overlay.layer);
+    }
+}
+
+async function refreshRouteOverlay(overlay, fit) {
+    const map = overlay.map;
+    const zoom = map.getZoom();
+    if (overlay.tiers) {
+        const tier = overlay.tiers.find(t => zoom <= t) ?? overlay.tiers[overlay.tiers.length - 1];
+        if (overlay.cache[tier]) {
+            drawRouteOverlay(overlay, overlay.cache[tier]);
+            return;
+        }
+    }
+
+    const bounds = map.getBounds();
+    const params = new URLSearchParams({
+        zoom: zoom, south: bounds.getSouth(), west: bounds.getWest(),
+        north: bounds.getNorth(), east: bounds.getEast()
+    });
+    const request = ++overlay.request;
+    try {
+        const response = await fetch(`${overlay.url}?${params}`);
+        // A newer pan/zoom (or another route) superseded this request
+        if (!response.ok || request !== overlay.request || overlay.removed) return;
+        const data = await response.json();
+        overlay.tiers = data.tiers;
+        if (!data.clipped) overlay.cache[data.tier] = data;
+        drawRouteOverlay(overlay, data);
+        if (fit && data.bounds) {
+            const [south, west, north, east] = data.bounds;
+            map.fitBounds([[south, west], [north, east]], { padding: [20, 20] });
+        }
+    } catch (err) {
+        console.error('Error loading route overlay:', err);
+    }
+}
+
+function clearRouteOverlay(mapId) {
+    const overlay = routeOverlays[mapId];
+    if (!overlay) return;
+    overlay.removed = true;
+    overlay.map.off('moveend', overlay.onMove);
+    overlay.layer.remove();
+    delete routeOverlays[mapId];
+}
+
+function showRouteOverlay(mapId, url) {
+    clearRouteOverlay(mapId);
+    const mapElement = getElement(mapId);
+    if (!mapElement || !mapElement.map) {
+        console.error('Map or map element not found');
+        return;
+    }
+    const map = mapElement.map;
+    const overlay = { url: url, map: map, layer: L.layerGroup().addTo(map), cache: {}, tiers: null, request: 0 };
+    overlay.onMove = () => refreshRouteOverlay(overlay, false);
+    map.on('moveend', overlay.onMove);
+    routeOverlays[mapId] = overlay;
+    refreshRouteOverlay(overlay, true);
+}
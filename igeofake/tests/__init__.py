@@ -0,0 +1,4 @@
+"""Behaviour tests for the pure modules; run from igeofake/ with
+
+    python -m unittest discover tests
+"""
@@ -0,0 +1,101 @@
+import asyncio
+import math
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+import journal
+from journal import SOURCE_CLEAR, SOURCE_ROUTE, SOURCE_SESSION, SOURCE_SET, Journal, JournalReader, diff
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'session.igj')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, path: str, records: list[tuple]):
+        j = Journal(path)
+        for udid, source, lat, lon in records:
+            j.record(udid, source, lat, lon)
+        j.close()
+
+    def test_round_trip_across_two_runs(self):
+        self.write(self.path, [("a", SOURCE_SET, 25.0, 121.0), ("b", SOURCE_ROUTE, 25.1, 121.1)])
+        first_run_ended = time.time()
+        time.sleep(0.2) # the app is down
+        self.write(self.path, [("b", SOURCE_ROUTE, 25.2, 121.2), ("a", SOURCE_CLEAR, math.nan, math.nan)])
+
+        reader = JournalReader(self.path)
+        self.assertEqual(reader.sessions, 2)
+        self.assertEqual(len(reader), 4)
+        self.assertEqual(reader.devices, ["a", "b"])
+        records = reader.select()
+        self.assertEqual(records['lat'][:3].tolist(), [25.0, 25.1, 25.2])
+        self.assertTrue(np.isnan(records['lat'][3]))
+        self.assertEqual(reader.select("b")['lat'].tolist(), [25.1, 25.2])
+        self.assertEqual(len(reader.select("unknown")), 0)
+
+        # The journal clock skips the downtime; the wall-clock times do not
+        self.assertTrue((np.diff(records['t']) >= 0).all())
+        self.assertLess(records['t'][2] - records['t'][1], 0.1)
+        sent = reader.wall[reader.records['source'] != SOURCE_SESSION]
+        self.assertGreaterEqual(sent[2], first_run_ended)
+        self.assertGreaterEqual(sent[2] - sent[1], 0.2)
+
+        summary = reader.summary()
+        self.assertEqual(summary["devices"], {"a": 2, "b": 2})
+        self.assertEqual(summary["sources"]["route"], 2)
+
+    def test_half_written_record_is_dropped(self):
+        self.write(self.path, [("a", SOURCE_SET, 25.0, 121.0)])
+        with open(self.path, 'ab') as f:
+            f.write(b'\0' * 7)
+        self.assertEqual(len(JournalReader(self.path)), 1)
+        self.write(self.path, [("a", SOURCE_SET, 25.1, 121.1)])
+        self.assertEqual(JournalReader(self.path).select()['lat'].tolist(), [25.0, 25.1])
+
+    def test_records_wait_for_the_flush_timer(self):
+        async def session():
+            j = Journal(self.path)
+            j.record("a", SOURCE_SET, 25.0, 121.0)
+            self.assertEqual(len(JournalReader(self.path)), 0)
+            await asyncio.sleep(0.1)
+            self.assertEqual(len(JournalReader(self.path)), 1)
+            j.close()
+
+        interval, journal.FLUSH_INTERVAL = journal.FLUSH_INTERVAL, 0.05
+        try:
+            asyncio.run(session())
+        finally:
+            journal.FLUSH_INTERVAL = interval
+
+    def test_not_a_journal(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'x' * 100)
+        with self.assertRaises(ValueError):
+            JournalReader(self.path)
+
+    def test_diff(self):
+        other = os.path.join(self.dir.name, 'other.igj')
+        records = [("a", SOURCE_SET, 25.0, 121.0), ("a", SOURCE_ROUTE, 25.001, 121.0), ("a", SOURCE_CLEAR, math.nan, math.nan)]
+        self.write(self.path, records)
+        self.write(other, records)
+        same = diff(JournalReader(self.path), JournalReader(other))
+        self.assertIsNone(same["first_difference"])
+        self.assertEqual(same["compared"], 3)
+
+        moved = os.path.join(self.dir.name, 'moved.igj')
+        self.write(moved, [records[0], ("a", SOURCE_ROUTE, 25.002, 121.0), records[2]])
+        result = diff(JournalReader(self.path), JournalReader(moved))
+        self.assertEqual((result["first_difference"], result["differences"]), (1, 1))
+        self.assertAlmostEqual(result["max_distance_m"], 111.2, delta=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+
+from polyline import CLIP_MIN_POINTS, TIER_ZOOMS, RouteTiers, encode, tier_for
+from preprocess import from_columns
+from route import Route
+
+
+class EncodeTest(unittest.TestCase):
+    def test_reference_polyline(self):
+        # The example from Google's encoded polyline algorithm documentation
+        lat = np.array([38.5, 40.7, 43.252])
+        lon = np.array([-120.2, -120.95, -126.453])
+        self.assertEqual(encode(lat, lon), "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+
+    def test_empty(self):
+        self.assertEqual(encode(np.zeros(0), np.zeros(0)), "")
+
+    def test_zero(self):
+        self.assertEqual(encode(np.array([0.0]), np.array([0.0])), "??")
+
+
+class TiersTest(unittest.TestCase):
+    def test_tier_for(self):
+        self.assertEqual(tier_for(3), TIER_ZOOMS[0])
+        self.assertEqual(tier_for(12.5), 13)
+        self.assertEqual(tier_for(21), TIER_ZOOMS[-1])
+
+    def test_empty_route(self):
+        tiers = RouteTiers(Route())
+        self.assertIsNone(tiers.bounds)
+        result = tiers.polylines(13)
+        self.assertEqual((result["points"], result["polylines"]), (0, []))
+
+    def test_coarser_tiers_keep_fewer_points(self):
+        # A wandering walk northwards: ~5 m of sideways noise survives the finest tier
+        rng = np.random.default_rng(1)
+        lat = np.linspace(25.0, 25.05, 20_000)
+        route = from_columns(lat, 121.0 + rng.normal(0, 5e-5, len(lat)))
+        tiers = RouteTiers(route)
+        sizes = [len(tiers.tiers[zoom][0]) for zoom in TIER_ZOOMS]
+        self.assertEqual(sizes, sorted(sizes))
+        self.assertLess(sizes[0], sizes[-1])
+
+        # Zoomed in on a small window, a large tier is sent only around the view
+        south, west, north, east = 25.02, 120.99, 25.021, 121.01
+        whole = tiers.polylines(17)
+        clipped = tiers.polylines(17, (south, west, north, east))
+        self.assertGreater(whole["points"], CLIP_MIN_POINTS)
+        self.assertFalse(whole["clipped"])
+        self.assertTrue(clipped["clipped"])
+        self.assertLess(clipped["points"], whole["points"] / 10)
+        self.assertEqual(len(clipped["polylines"]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+
+from preprocess import simplify_mask
+
+
+class SimplifyMaskTest(unittest.TestCase):
+    def test_empty(self):
+        keep = simplify_mask(np.zeros(0), np.zeros(0), 1.0)
+        self.assertEqual(keep.dtype, bool)
+        self.assertEqual(len(keep), 0)
+
+    def test_single_point(self):
+        self.assertEqual(simplify_mask(np.array([25.0]), np.array([121.0]), 1.0).tolist(), [True])
+
+    def test_two_points_are_both_kept(self):
+        keep = simplify_mask(np.array([25.0, 25.001]), np.array([121.0, 121.001]), 1000.0)
+        self.assertEqual(keep.tolist(), [True, True])
+
+    def test_collinear_points_collapse_to_the_ends(self):
+        lat = np.linspace(25.0, 25.01, 50)
+        lon = np.full(50, 121.0)
+        keep = simplify_mask(lat, lon, 1.0)
+        self.assertEqual(np.flatnonzero(keep).tolist(), [0, 49])
+
+    def test_corner_is_kept(self):
+        # An L shape: ~1.1 km north, then ~1 km east
+        lat = np.concatenate((np.linspace(25.0, 25.01, 11), np.full(10, 25.01)))
+        lon = np.concatenate((np.full(11, 121.0), np.linspace(121.001, 121.01, 10)))
+        keep = simplify_mask(lat, lon, 1.0)
+        self.assertEqual(np.flatnonzero(keep).tolist(), [0, 10, 20])
+
+    def test_tolerance_drops_small_deviations(self):
+        lat = np.array([25.0, 25.005, 25.01])
+        lon = np.array([121.0, 121.00001, 121.0]) # middle point ~1 m off the chord
+        self.assertEqual(simplify_mask(lat, lon, 5.0).tolist(), [True, False, True])
+        self.assertEqual(simplify_mask(lat, lon, 0.5).tolist(), [True, True, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
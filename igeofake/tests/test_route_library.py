@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+from route import Route
+from route_library import RouteLibrary
+
+
+def line(lat0: float, lon0: float, points: int = 20, step: float = 0.001) -> Route:
+    route = Route()
+    for i in range(points):
+        route.append(lat0 + i * step, lon0)
+    return route
+
+
+class RouteLibraryTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.library = RouteLibrary(os.path.join(self.dir.name, 'library.sqlite3'))
+
+    def tearDown(self):
+        self.library.close()
+        self.dir.cleanup()
+
+    def test_ingest_describes_the_route(self):
+        entry = self.library.ingest('taipei.gpx', 'Taipei', 'a', line(25.03, 121.56))
+        self.assertEqual(entry["points"], 20)
+        self.assertAlmostEqual(entry["length"], 19 * 111.2, delta=5)
+        self.assertEqual((entry["min_lat"], entry["min_lon"]), (25.03, 121.56))
+        self.assertEqual(self.library.find('taipei.gpx')["id"], entry["id"])
+
+    def test_same_content_is_stored_once(self):
+        first = self.library.ingest('a.gpx', 'A', 'same', line(25.03, 121.56))
+        second = self.library.ingest('b.gpx', 'B', 'same', line(25.03, 121.56))
+        self.assertEqual(first["id"], second["id"])
+        self.assertEqual(second["name"], 'B')
+        self.assertEqual(len(self.library), 1)
+
+    def test_near_uses_the_bounding_boxes(self):
+        taipei = self.library.ingest('taipei.gpx', 'Taipei', 'a', line(25.03, 121.56))
+        beside = self.library.ingest('beside.gpx', 'Beside', 'b', line(25.03, 121.565))
+        self.library.ingest('tokyo.gpx', 'Tokyo', 'c', line(35.68, 139.76))
+
+        # Inside Taipei's box, ~500 m from the second route
+        found = self.library.near(25.035, 121.56, radius_m=1000)
+        self.assertEqual([row["id"] for row in found], [taipei["id"], beside["id"]])
+        self.assertEqual(found[0]["distance"], 0.0)
+        self.assertAlmostEqual(found[1]["distance"], 505, delta=10)
+        self.assertEqual([row["id"] for row in self.library.near(25.035, 121.56, radius_m=100)], [taipei["id"]])
+        self.assertEqual(self.library.near(0.0, 0.0), [])
+
+    def test_remove(self):
+        entry = self.library.ingest('taipei.gpx', 'Taipei', 'a', line(25.03, 121.56))
+        self.assertTrue(self.library.remove(entry["id"]))
+        self.assertFalse(self.library.remove(entry["id"]))
+        self.assertIsNone(self.library.get(entry["id"]))
+        self.assertEqual(self.library.near(25.035, 121.56), [])
+
+    def test_empty_route_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.library.ingest('empty.gpx', 'Empty', 'e', Route())
+
+
+if __name__ == '__main__':
+    unittest.main()